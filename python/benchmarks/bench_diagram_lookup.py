@@ -0,0 +1,84 @@
+# benchmarks/bench_diagram_lookup.py
+"""
+Node lookup and cold-start cost against diagram size.
+
+Compares the old read-parse-scan lookup with the cached DiagramRegistry, and
+a cold start from the JSON with one from the compiled snapshot, on
+synthetic diagrams. Run from the `python/` directory:
+
+    python benchmarks/bench_diagram_lookup.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Keep the compiled snapshots of the synthetic diagrams out of the real cache
+os.environ.setdefault('MMP_CACHE_DIR', tempfile.mkdtemp(prefix='mmp-bench-'))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'handlerApp')))
+
+from data_calls.diagram_registry import DiagramRegistry
+
+
+def make_diagram(n_nodes: int) -> dict:
+    nodes = [{
+        "id": f"node_{i}",
+        "type": "function",
+        "name": f"fn_{i}",
+        "description": "synthetic node " * 8,
+        "importPath": {"module": "math_operations.add_ops", "function": "add_numbers", "aliases": f"alias_{i}"},
+        "parameters": {"numbers": {"type": "array", "description": "List of numbers"}},
+    } for i in range(n_nodes)]
+    edges = [{"source": f"node_{i // 2}", "target": f"node_{i}"} for i in range(1, n_nodes)]
+    return {"nodes": nodes, "edges": edges}
+
+
+def legacy_find(path: str, name: str):
+    with open(path, 'r', encoding='utf-8') as file:
+        graph = json.loads(file.read())
+    for n in graph.get("nodes", []):
+        if n.get("name") == name:
+            return n
+
+
+def per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    print(f"{'nodes':>8} {'legacy (us)':>14} {'registry (us)':>14} {'speedup':>10}")
+    for n_nodes in (10, 100, 1000, 10000):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'diagram.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(make_diagram(n_nodes), f)
+
+            target = f"fn_{n_nodes - 1}"  # worst case for the linear scan
+            registry = DiagramRegistry(path, compiled=False)
+            registry.find_by_name(target)  # initial parse is paid once
+
+            legacy = per_call(lambda: legacy_find(path, target), max(5, 20000 // n_nodes))
+            cached = per_call(lambda: registry.find_by_name(target), 20000)
+            print(f"{n_nodes:>8} {legacy * 1e6:>14.1f} {cached * 1e6:>14.2f} {legacy / cached:>9.0f}x")
+
+    print(f"\n{'nodes':>8} {'cold JSON (ms)':>16} {'cold snapshot (ms)':>20}")
+    for n_nodes in (100, 1000, 10000, 50000):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'diagram.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(make_diagram(n_nodes), f)
+            DiagramRegistry(path).snapshot()  # writes the compiled snapshot
+
+            # Cold start = fresh registry; both sides end with the graph index built
+            repeat = max(3, 2000 // n_nodes)
+            from_json = per_call(lambda: DiagramRegistry(path, compiled=False).snapshot().graph_index, repeat)
+            from_blob = per_call(lambda: DiagramRegistry(path).snapshot().graph_index, repeat)
+            print(f"{n_nodes:>8} {from_json * 1e3:>16.2f} {from_blob * 1e3:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
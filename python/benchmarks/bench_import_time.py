@@ -0,0 +1,65 @@
+# benchmarks/bench_import_time.py
+"""
+Cold-import regression check based on `python -X importtime`.
+
+Each run imports the target module in a fresh interpreter and reads the
+cumulative time the interpreter reports for it. Exits with status 1 when the
+best run is over budget, so it can gate CI. Run from the `python/` directory:
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --budget-ms 800 --module handlerApp.analytics.sklearnpredictor
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+PYTHON_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def import_profile(module: str):
+    """Return [(self_us, cumulative_us, name)] for one cold import of `module`."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PYTHON_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), m.group(4)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--module', default='handlerApp.data_calls.dataObjectLoad')
+    parser.add_argument('--budget-ms', type=float, default=1000.0)
+    parser.add_argument('--runs', type=int, default=3, help="best of N fresh interpreters")
+    parser.add_argument('--top', type=int, default=10, help="heaviest imports to list")
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.runs):
+        rows = import_profile(args.module)
+        total = next(cum for _, cum, name in reversed(rows) if name == args.module)
+        if best is None or total < best[0]:
+            best = (total, rows)
+
+    total_us, rows = best
+    print(f"Heaviest imports (self time) for {args.module}:")
+    for self_us, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:>8.1f} ms  {name}")
+
+    total_ms = total_us / 1000
+    status = "OK" if total_ms <= args.budget_ms else "OVER BUDGET"
+    print(f"\n{args.module}: {total_ms:.1f} ms cold import (budget {args.budget_ms:.0f} ms) {status}")
+    sys.exit(0 if total_ms <= args.budget_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
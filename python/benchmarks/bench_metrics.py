@@ -0,0 +1,101 @@
+# benchmarks/bench_metrics.py
+"""
+train_model's metric block: the sklearn.metrics calls vs. one confusion matrix.
+
+For each test-set size, runs the dozen sklearn calls train_model used to make
+(binary, per-class, weighted and macro precision/recall/F1, confusion_matrix,
+classification_report) and the single-pass ClassificationMetrics, checks that
+every number and the report text agree, and prints both timings. Run from
+the `python/` directory:
+
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --rows 1000000 5000000 --classes 2 10
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'handlerApp')))
+
+from analytics.metrics import classification_metrics
+
+warnings.filterwarnings('ignore')
+
+
+def sklearn_block(y_test, y_pred, binary: bool):
+    """The metric calls train_model made before the single-pass engine."""
+    from sklearn.metrics import (
+        accuracy_score, classification_report, confusion_matrix, f1_score, precision_score, recall_score,
+    )
+    out = {'accuracy': accuracy_score(y_test, y_pred)}
+    if binary:
+        out['binary'] = tuple(fn(y_test, y_pred, average='binary', zero_division=0)
+                              for fn in (precision_score, recall_score, f1_score))
+    for average in (None, 'weighted', 'macro'):
+        out[average] = tuple(fn(y_test, y_pred, average=average, zero_division=0)
+                             for fn in (precision_score, recall_score, f1_score))
+    out['confusion'] = confusion_matrix(y_test, y_pred)
+    out['report'] = classification_report(y_test, y_pred, zero_division=0)
+    return out
+
+
+def single_pass(y_test, y_pred, binary: bool):
+    m = classification_metrics(y_test, y_pred, zero_division=0)
+    out = {'accuracy': m.accuracy}
+    if binary:
+        out['binary'] = m.binary(pos_label=1)
+    out[None] = (m.precision, m.recall, m.f1)
+    for average in ('weighted', 'macro'):
+        out[average] = m.average(average)
+    out['confusion'] = m.confusion
+    out['report'] = m.report()
+    return out
+
+
+def check_equal(expected, actual):
+    for key, value in expected.items():
+        if key is None:
+            assert all(np.array_equal(a, b) for a, b in zip(value, actual[key])), key
+        elif key == 'confusion':
+            assert np.array_equal(value, actual[key]), key
+        else:
+            assert value == actual[key], (key, value, actual[key])
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--classes', type=int, nargs='+', default=[2, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'classes':>8} {'sklearn (s)':>12} {'single (s)':>11} {'speedup':>8}")
+    for n_classes in args.classes:
+        for n_rows in args.rows:
+            # Labels as train_model sees them: float columns of the feature matrix
+            y_test = rng.integers(0, n_classes, n_rows).astype(np.float64)
+            y_pred = np.where(rng.random(n_rows) < 0.7, y_test, rng.integers(0, n_classes, n_rows)).astype(np.float64)
+            binary = n_classes == 2
+
+            check_equal(sklearn_block(y_test, y_pred, binary), single_pass(y_test, y_pred, binary))
+            slow = best_of(lambda: sklearn_block(y_test, y_pred, binary), args.repeat)
+            fast = best_of(lambda: single_pass(y_test, y_pred, binary), args.repeat)
+            print(f"{n_rows:>10} {n_classes:>8} {slow:>12.3f} {fast:>11.4f} {slow / fast:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
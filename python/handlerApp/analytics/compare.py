@@ -0,0 +1,217 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from analytics.estimators import ESTIMATORS, available_estimators, make_estimator
+from analytics.metrics import classification_metrics, infer_task, is_continuous, regression_metrics
+from analytics.sklearnpredictor import DENSE_ONLY_MODELS
+from data_calls.cache_paths import cache_dir
+from data_calls.process_pool import pool_context
+from function_calls.cpu_budget import cpu_budget, limit_threads, set_cpu_budget
+
+# "Which model is best?" in one call: k-fold cross-validation of several
+# registry estimators, one estimator per process.
+#
+# The feature matrix and labels are written once as .npy files and every
+# worker memory-maps them, so a pool of N workers shares one copy in the
+# page cache instead of receiving N pickled copies. Folds are rebuilt in
+# each worker from (cv, random_state), so every model sees the same splits.
+
+# Score each task is ranked by, then the other columns shown
+SCORES = {
+    'classification': [('accuracy', 'Accuracy', True), ('f1_macro', 'Macro F1', True)],
+    'regression': [('r2', 'R²', True), ('rmse', 'RMSE', False), ('mae', 'MAE', False)],
+}
+
+
+def _share(X, y, root: str) -> dict:
+    """Write X and y under `root` as .npy files; returns what workers need to map them."""
+    spec = {'root': root}
+    if hasattr(X, 'tocsr'):
+        csr = X.tocsr()
+        for part in ('data', 'indices', 'indptr'):
+            np.save(os.path.join(root, f"X.{part}.npy"), getattr(csr, part))
+        spec['shape'] = csr.shape
+    else:
+        np.save(os.path.join(root, 'X.npy'), np.ascontiguousarray(X.to_numpy() if hasattr(X, 'to_numpy') else X))
+    y = np.asarray(y)
+    if y.dtype.kind not in 'biuf':
+        # Text classes: codes map cleanly and score the same
+        y = np.unique(y, return_inverse=True)[1].ravel()
+    np.save(os.path.join(root, 'y.npy'), y)
+    return spec
+
+
+def _load_shared(spec: dict):
+    root = spec['root']
+    y = np.load(os.path.join(root, 'y.npy'), mmap_mode='r')
+    if 'shape' in spec:
+        import scipy.sparse as sp
+        parts = [np.load(os.path.join(root, f"X.{part}.npy"), mmap_mode='r') for part in ('data', 'indices', 'indptr')]
+        return sp.csr_matrix(tuple(parts), shape=tuple(spec['shape']), copy=False), y
+    return np.load(os.path.join(root, 'X.npy'), mmap_mode='r'), y
+
+
+def _folds(y, cv: int, random_state: int, stratify: bool):
+    from sklearn.model_selection import KFold, StratifiedKFold
+    splitter = (StratifiedKFold if stratify else KFold)(n_splits=cv, shuffle=True, random_state=random_state)
+    return splitter.split(np.zeros(len(y)), y if stratify else None)
+
+
+def _score(task: str, y_true, y_pred) -> dict:
+    if task == 'regression':
+        return regression_metrics(y_true, y_pred)
+    # Only averaged scores are needed: no k x k matrix
+    metrics = classification_metrics(y_true, y_pred, zero_division=0, confusion=False)
+    return {'accuracy': metrics.accuracy, 'f1_macro': metrics.average('macro')[2]}
+
+
+# Runs in the process pool: module-level so it pickles; only the small
+# spec dict crosses the process boundary, never the matrix.
+
+def _cross_validate(spec: dict, name: str, params: dict, task: str, cv: int, random_state: int,
+                    stratify: bool, n_jobs: int) -> dict:
+    start = time.perf_counter()
+    try:
+        X, y = _load_shared(spec)
+        dense = hasattr(X, 'tocsr') and name in DENSE_ONLY_MODELS
+        folds = []
+        with limit_threads(n_jobs):
+            for train, test in _folds(y, cv, random_state, stratify):
+                model = make_estimator(name, params, n_jobs)
+                X_train, X_test = X[train], X[test]
+                if dense:
+                    X_train, X_test = X_train.toarray(), X_test.toarray()
+                model.fit(X_train, y[train])
+                folds.append(_score(task, y[test], model.predict(X_test)))
+        scores = {key: (float(np.mean([f[key] for f in folds])), float(np.std([f[key] for f in folds])))
+                  for key in folds[0]}
+        return {'model': name, 'scores': scores, 'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'model': name, 'error': f"{type(e).__name__}: {e}", 'seconds': time.perf_counter() - start}
+
+
+def _resolve_models(models, y):
+    """(task, models to run, {model: reason} for models that cannot be run)."""
+    if models in (None, True, 'all') or list(models) == ['all']:
+        task = infer_task(y)
+        return task, available_estimators(task), {}
+    models = [models] if isinstance(models, str) else list(models)
+    unknown = [m for m in models if m not in ESTIMATORS]
+    if unknown:
+        raise ValueError(f"Model(s) {unknown} not supported. Available models: {available_estimators()}")
+    tasks = {ESTIMATORS[m].task for m in models}
+    task = tasks.pop() if len(tasks) == 1 else infer_task(y)
+    if task == 'classification' and is_continuous(y):
+        raise ValueError("The label is continuous; compare regression models such as "
+                         f"{available_estimators('regression')[:3]}")
+    skipped = {m: f"is a {ESTIMATORS[m].task} model; this comparison is {task}"
+               for m in models if ESTIMATORS[m].task != task}
+    return task, [m for m in models if m not in skipped], skipped
+
+
+def _per_model_params(model_params, names) -> dict:
+    """{name: params}; flat params ({"C": 10}) are accepted when one model is compared."""
+    model_params = model_params or {}
+    flat = [key for key in model_params if key not in ESTIMATORS]
+    if not flat:
+        return model_params
+    if len(names) == 1 and len(flat) == len(model_params):
+        return {names[0]: model_params}
+    raise ValueError(f"model_params {flat} are not model names; when comparing several models give "
+                     f"them per model, e.g. {{\"{names[0] if names else 'SVC'}\": {{...}}}}")
+
+
+def compare_models(X, y, models=None, label_column: str = '', cv: int = 5, random_state: int = 42,
+                   model_params: dict = None, workers: int = None) -> str:
+    """
+    Cross-validate several registry models on the same folds and rank them.
+
+    Parameters
+    ----------
+    X : numpy.ndarray, scipy.sparse matrix or pandas.DataFrame
+        Features
+    y : array-like
+        Labels
+    models : list of str, optional
+        Registry names (see analytics/estimators.py); None or 'all' runs
+        every model of the label's task
+    label_column : str, optional
+        Label name, for the report
+    cv : int, optional (default=5)
+        Number of folds; stratified for classification when every class
+        has at least `cv` samples
+    random_state : int, optional (default=42)
+        Seed of the fold shuffle
+    model_params : dict, optional
+        Estimator keyword arguments per model, {name: {param: value}}; a
+        flat {param: value} is accepted when only one model is compared
+    workers : int, optional
+        Processes to run models in (default: the CPU budget); the budget is
+        split between them for each model's n_jobs
+
+    Returns
+    -------
+    str : Markdown ranking, best model first
+    """
+    task, names, skipped = _resolve_models(models, y)
+    n_samples = X.shape[0]
+    cv = min(int(cv), n_samples)
+    if cv < 2:
+        raise ValueError(f"Cross-validation needs at least 2 folds and 2 samples, got cv={cv}")
+    stratify = False
+    if task == 'classification':
+        stratify = int(np.unique(np.asarray(y), return_counts=True)[1].min()) >= cv
+    model_params = _per_model_params(model_params, names)
+    for name in names:
+        # Bad parameters fail here, before any process is started
+        make_estimator(name, model_params.get(name))
+
+    budget = cpu_budget()
+    workers = max(1, min(len(names), workers or budget))
+    n_jobs = max(1, budget // workers)
+    root = tempfile.mkdtemp(dir=cache_dir('compare'))
+    start = time.perf_counter()
+    try:
+        spec = _share(X, y, root)
+        jobs = [(spec, name, model_params.get(name), task, cv, random_state, stratify, n_jobs) for name in names]
+        if workers == 1:
+            results = [_cross_validate(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(workers, mp_context=pool_context(), initializer=set_cpu_budget,
+                                     initargs=(n_jobs,)) as pool:
+                results = [future.result() for future in [pool.submit(_cross_validate, *job) for job in jobs]]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+
+    columns = SCORES[task]
+    primary, _, higher_is_better = columns[0]
+    ranked = sorted((r for r in results if 'scores' in r),
+                    key=lambda r: r['scores'][primary][0], reverse=higher_is_better)
+    failed = [r for r in results if 'error' in r] + [{'model': m, 'error': reason} for m, reason in skipped.items()]
+
+    summary_lines = [
+        f"**Model Comparison:** {cv}-fold cross-validation ({task})",
+        f"**Target Column:** {label_column}",
+        f"**Samples:** {n_samples}",
+        f"**Models:** {len(names)} in {workers} process{'es' if workers > 1 else ''}, {elapsed:.1f} s",
+        "",
+        "| Rank | Model | " + " | ".join(title for _, title, _ in columns) + " | Time (s) |",
+        "|---:|---|" + "---|" * len(columns) + "---:|",
+    ]
+    for rank, r in enumerate(ranked, 1):
+        cells = [f"{r['scores'][key][0]:.4f} ± {r['scores'][key][1]:.4f}" for key, _, _ in columns]
+        summary_lines.append(f"| {rank} | {r['model']} | " + " | ".join(cells) + f" | {r['seconds']:.2f} |")
+    if ranked:
+        summary_lines.append(f"\n**Best Model:** {ranked[0]['model']}")
+    if failed:
+        summary_lines.append("\n### Not Ranked")
+        summary_lines.extend(f"- **{r['model']}:** {r['error']}" for r in failed)
+    return "\n".join(summary_lines)
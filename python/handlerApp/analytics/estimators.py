@@ -0,0 +1,96 @@
+import importlib
+import inspect
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_calls.cpu_budget import cpu_budget
+
+# Estimators train_model can build, by name. Nothing is imported until a
+# model is asked for, and only that model's module is imported then.
+
+
+class EstimatorSpec:
+    """Where an estimator class lives and how it is built by default."""
+
+    def __init__(self, module: str, class_name: str, defaults: dict = None, parallel: bool = False,
+                 task: str = 'classification'):
+        self.module = module
+        self.class_name = class_name
+        self.task = task  # 'classification' or 'regression'
+        self.defaults = defaults or {}
+        # True when the estimator's n_jobs actually parallelises fit/predict
+        self.parallel = parallel
+        self._cls = None
+
+    def load(self):
+        if self._cls is None:
+            self._cls = getattr(importlib.import_module(self.module), self.class_name)
+        return self._cls
+
+
+ESTIMATORS = {
+    # Classification models
+    'LogisticRegression': EstimatorSpec('sklearn.linear_model', 'LogisticRegression', {'max_iter': 1000}),
+    'DecisionTreeClassifier': EstimatorSpec('sklearn.tree', 'DecisionTreeClassifier'),
+    'RandomForestClassifier': EstimatorSpec('sklearn.ensemble', 'RandomForestClassifier', parallel=True),
+    'GradientBoostingClassifier': EstimatorSpec('sklearn.ensemble', 'GradientBoostingClassifier'),
+    'SVC': EstimatorSpec('sklearn.svm', 'SVC'),
+    'KNeighborsClassifier': EstimatorSpec('sklearn.neighbors', 'KNeighborsClassifier', parallel=True),
+    'GaussianNB': EstimatorSpec('sklearn.naive_bayes', 'GaussianNB'),
+
+    # Regression models
+    'LinearRegression': EstimatorSpec('sklearn.linear_model', 'LinearRegression', parallel=True, task='regression'),
+    'Ridge': EstimatorSpec('sklearn.linear_model', 'Ridge', task='regression'),
+    'Lasso': EstimatorSpec('sklearn.linear_model', 'Lasso', task='regression'),
+    'DecisionTreeRegressor': EstimatorSpec('sklearn.tree', 'DecisionTreeRegressor', task='regression'),
+    'RandomForestRegressor': EstimatorSpec('sklearn.ensemble', 'RandomForestRegressor', parallel=True, task='regression'),
+    'GradientBoostingRegressor': EstimatorSpec('sklearn.ensemble', 'GradientBoostingRegressor', task='regression'),
+    'SVR': EstimatorSpec('sklearn.svm', 'SVR', task='regression'),
+    'KNeighborsRegressor': EstimatorSpec('sklearn.neighbors', 'KNeighborsRegressor', parallel=True, task='regression'),
+}
+
+
+def register_estimator(name: str, module: str, class_name: str, defaults: dict = None,
+                       parallel: bool = False, task: str = 'classification') -> None:
+    """Make another estimator available to train_model under `name`."""
+    ESTIMATORS[name] = EstimatorSpec(module, class_name, defaults, parallel, task)
+
+
+def available_estimators(task: str = None) -> list:
+    """Registered names, optionally only those for 'classification' or 'regression'."""
+    return [name for name, spec in ESTIMATORS.items() if task is None or spec.task == task]
+
+
+def make_estimator(name: str, params: dict = None, n_jobs: int = None):
+    """
+    Build estimator `name`, importing only its own module.
+
+    Parameters
+    ----------
+    name : str
+        Registered estimator name, e.g. 'RandomForestClassifier'
+    params : dict, optional
+        Constructor keyword arguments (e.g. from the diagram node), applied
+        over the registry defaults
+    n_jobs : int, optional
+        Jobs for estimators that parallelise; defaults to the process's CPU
+        budget. An explicit `n_jobs` in `params` wins.
+
+    Returns
+    -------
+    An unfitted scikit-learn estimator
+    """
+    spec = ESTIMATORS.get(name)
+    if spec is None:
+        raise ValueError(f"Model '{name}' not supported. Available models: {available_estimators()}")
+    cls = spec.load()
+    kwargs = {**spec.defaults, **(params or {})}
+
+    accepted = set(inspect.signature(cls.__init__).parameters) - {'self'}
+    unknown = sorted(set(kwargs) - accepted)
+    if unknown:
+        raise ValueError(f"Model '{name}' does not accept {unknown}. Valid parameters: {sorted(accepted)}")
+    if spec.parallel and 'n_jobs' not in kwargs:
+        kwargs['n_jobs'] = n_jobs or cpu_budget()
+    return cls(**kwargs)
@@ -0,0 +1,224 @@
+import numpy as np
+
+# Classification metrics from a single confusion matrix.
+#
+# sklearn's precision_score/recall_score/f1_score/confusion_matrix/
+# classification_report each re-validate the inputs, re-discover the labels
+# and rebuild a confusion matrix; train_model used to call them a dozen
+# times per report. Here the labels are encoded once, the matrix is built
+# with one np.bincount, and every per-class and averaged score is derived
+# from it with the same formulas sklearn uses, so the numbers (and the
+# report text) are identical.
+
+# Integer-valued labels below this are counted directly instead of sorted
+_DIRECT_LABEL_LIMIT = 1 << 20
+
+
+def _encode(y_true, y_pred):
+    """Return (labels, true codes, pred codes); labels sorted as sklearn's unique_labels."""
+    t = np.asarray(y_true).ravel()
+    p = np.asarray(y_pred).ravel()
+    if len(t) != len(p):
+        raise ValueError(f"Found input variables with inconsistent numbers of samples: [{len(t)}, {len(p)}]")
+    dtype = np.result_type(t, p) if t.dtype.kind in 'biuf' and p.dtype.kind in 'biuf' else None
+
+    if dtype is not None and len(t):
+        # Non-negative whole numbers (class ids, one-hot-encoded labels stored
+        # as float) are counted with bincount instead of sorted by np.unique
+        ti = t.astype(np.int64)
+        pi = p.astype(np.int64)
+        lo = min(ti.min(), pi.min())
+        hi = max(ti.max(), pi.max())
+        if lo >= 0 and hi < _DIRECT_LABEL_LIMIT and (ti == t).all() and (pi == p).all():
+            present = np.bincount(ti, minlength=hi + 1) + np.bincount(pi, minlength=hi + 1)
+            values = np.flatnonzero(present)
+            lookup = np.zeros(hi + 1, dtype=np.int64)
+            lookup[values] = np.arange(len(values))
+            return values.astype(dtype), lookup[ti], lookup[pi]
+
+    labels, codes = np.unique(np.concatenate([t, p]), return_inverse=True)
+    codes = codes.ravel()
+    return labels, codes[:len(t)], codes[len(t):]
+
+
+def _divide(numerator, denominator, zero_division):
+    denominator = np.asarray(denominator, dtype=np.float64)
+    mask = denominator == 0
+    result = np.asarray(numerator, dtype=np.float64) / np.where(mask, 1.0, denominator)
+    result[mask] = zero_division
+    return result
+
+
+class ClassificationMetrics:
+    """
+    Every classification score train_model reports, from one pass over the data.
+
+    Parameters
+    ----------
+    y_true, y_pred : array-like
+        True and predicted labels
+    zero_division : float, optional (default=0)
+        Value used where a precision, recall or F1 denominator is zero
+    confusion : bool, optional (default=True)
+        Build the k x k confusion matrix. Without it every score is still
+        computed, from three O(n + k) bincounts, so thousands of labels
+        cost no k² memory
+
+    Attributes
+    ----------
+    labels : numpy.ndarray
+        Sorted labels found in y_true or y_pred
+    confusion : numpy.ndarray or None
+        Confusion matrix, rows true and columns predicted, ordered as `labels`
+    precision, recall, f1, support : numpy.ndarray
+        Per-class scores and true counts, ordered as `labels`
+    accuracy : float
+    """
+
+    def __init__(self, y_true, y_pred, zero_division: float = 0, confusion: bool = True):
+        self.zero_division = zero_division
+        self.labels, true_codes, pred_codes = _encode(y_true, y_pred)
+        k = len(self.labels)
+        if confusion:
+            self.confusion = np.bincount(true_codes * k + pred_codes, minlength=k * k).reshape(k, k)
+            self.tp = np.diag(self.confusion).copy()
+            self.support = self.confusion.sum(axis=1)
+            self.predicted = self.confusion.sum(axis=0)
+        else:
+            self.confusion = None
+            self.tp = np.bincount(true_codes[true_codes == pred_codes], minlength=k)
+            self.support = np.bincount(true_codes, minlength=k)
+            self.predicted = np.bincount(pred_codes, minlength=k)
+        self.n_samples = int(self.support.sum())
+
+        self.precision = _divide(self.tp, self.predicted, zero_division)
+        self.recall = _divide(self.tp, self.support, zero_division)
+        self.f1 = _divide(2.0 * self.tp, self.support + self.predicted, zero_division)
+        self.accuracy = float(self.tp.sum() / self.n_samples) if self.n_samples else 0.0
+
+    def average(self, average: str):
+        """
+        Averaged (precision, recall, f1) as sklearn's `average=` computes them.
+
+        Parameters
+        ----------
+        average : {'macro', 'weighted', 'micro'}
+        """
+        if average == 'micro':
+            tp, predicted, support = self.tp.sum(), self.predicted.sum(), self.support.sum()
+            return (
+                float(_divide([tp], [predicted], self.zero_division)[0]),
+                float(_divide([tp], [support], self.zero_division)[0]),
+                float(_divide([2.0 * tp], [support + predicted], self.zero_division)[0]),
+            )
+        if average == 'macro':
+            weights = None
+        elif average == 'weighted':
+            weights = self.support if self.support.sum() else None
+        else:
+            raise ValueError(f"Average '{average}' not supported. Use 'macro', 'weighted' or 'micro'")
+        if not len(self.labels):
+            return np.nan, np.nan, np.nan
+        return tuple(float(np.average(scores, weights=weights))
+                     for scores in (self.precision, self.recall, self.f1))
+
+    def binary(self, pos_label=1):
+        """
+        (precision, recall, f1) of `pos_label`, as sklearn's `average='binary'`.
+
+        Raises ValueError, like sklearn, for more than two labels or when
+        pos_label is not one of two present labels.
+        """
+        if len(self.labels) > 2:
+            raise ValueError(f"Target is multiclass but average='binary'. Labels: {list(self.labels)}")
+        index = np.flatnonzero(self.labels == pos_label)
+        if len(index):
+            i = index[0]
+            return float(self.precision[i]), float(self.recall[i]), float(self.f1[i])
+        if len(self.labels) >= 2:
+            raise ValueError(f"pos_label={pos_label!r} is not a valid label. "
+                             f"It should be one of {list(self.labels)}")
+        return (float(self.zero_division),) * 3
+
+    def report(self, digits: int = 2) -> str:
+        """The text sklearn's classification_report(y_true, y_pred) prints."""
+        target_names = ["%s" % label for label in self.labels]
+        headers = ["precision", "recall", "f1-score", "support"]
+        width = max(max((len(name) for name in target_names), default=0), len("weighted avg"), digits)
+        report = ("{:>{width}s} " + " {:>9}" * len(headers)).format("", *headers, width=width)
+        report += "\n\n"
+        row_fmt = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+        # sklearn's supports come out as floats ("2.0") when no prediction
+        # at all is correct; keep that so the text matches
+        support = self.support if self.tp.any() else self.support.astype(np.float64)
+        for row in zip(target_names, self.precision, self.recall, self.f1, support):
+            report += row_fmt.format(*row, width=width, digits=digits)
+        report += "\n"
+
+        total = support.sum()
+        accuracy_fmt = "{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f}" + " {:>9}\n"
+        report += accuracy_fmt.format("accuracy", "", "", self.average('micro')[2], total,
+                                      width=width, digits=digits)
+        for average in ('macro', 'weighted'):
+            report += row_fmt.format(f"{average} avg", *self.average(average), total,
+                                     width=width, digits=digits)
+        return report
+
+
+def classification_metrics(y_true, y_pred, zero_division: float = 0, confusion: bool = True) -> ClassificationMetrics:
+    """Build the confusion matrix once and derive every classification score from it."""
+    return ClassificationMetrics(y_true, y_pred, zero_division, confusion)
+
+
+# Labels with more distinct whole-number values than this are treated as a
+# regression target when no estimator is named
+MAX_CLASSES = 50
+
+
+def is_continuous(y) -> bool:
+    """True for numeric labels with non-integer values, which no classifier accepts."""
+    y = np.asarray(y)
+    return y.dtype.kind == 'f' and not bool(np.all(np.mod(y, 1) == 0))
+
+
+def infer_task(y, max_classes: int = MAX_CLASSES) -> str:
+    """
+    'classification' or 'regression', from the label values alone.
+
+    Non-numeric and boolean labels are classes; numeric labels are a
+    regression target when they are continuous or have more than
+    `max_classes` distinct values.
+    """
+    y = np.asarray(y)
+    if y.dtype.kind not in 'iuf':
+        return 'classification'
+    if is_continuous(y):
+        return 'regression'
+    return 'classification' if len(np.unique(y)) <= max_classes else 'regression'
+
+
+def regression_metrics(y_true, y_pred) -> dict:
+    """
+    MAE, RMSE and R² in O(n), equal to sklearn's mean_absolute_error,
+    root_mean_squared_error and r2_score.
+
+    Returns
+    -------
+    dict : {'mae': float, 'rmse': float, 'r2': float}
+    """
+    y_true = np.asarray(y_true, dtype=np.float64).ravel()
+    y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+    error = y_true - y_pred
+    squared = error * error
+    ss_res = squared.sum()
+    ss_tot = ((y_true - y_true.mean()) ** 2).sum()
+    if ss_tot != 0:
+        r2 = 1 - ss_res / ss_tot
+    else:
+        # sklearn's force_finite: a constant target is perfect or uninformative
+        r2 = 1.0 if ss_res == 0 else 0.0
+    return {
+        'mae': float(np.abs(error).mean()),
+        'rmse': float(np.sqrt(squared.mean())),
+        'r2': float(r2),
+    }
@@ -0,0 +1,238 @@
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from data_calls.cache_paths import cache_dir
+
+# Fitted estimators, kept so a question about a dataset that was already
+# trained on is answered from disk instead of by refitting.
+#
+# An entry is `<key>.joblib` (the estimator and everything needed to use it)
+# plus a `<key>.json` sidecar that can be listed without unpickling. The key
+# covers the data fingerprint, the model name, its hyperparameters, the label
+# and the split. Entries are dumped uncompressed, so loading memory-maps the
+# estimator's numpy arrays (tree nodes, coefficients, support vectors)
+# instead of reading them, and the store is kept under `max_bytes` by
+# evicting the least recently used entries.
+
+DEFAULT_MAX_BYTES = int(os.environ.get('MMP_MODEL_STORE_BYTES', 1024 ** 3))
+_HASH_ROWS = 65536
+
+# Estimator parameters that change how fast a model trains, not what it learns
+RUNTIME_PARAMS = {'n_jobs', 'verbose', 'cache_size'}
+
+
+def data_fingerprint(data, columns: Optional[List[str]] = None) -> str:
+    """
+    sha256 of a feature matrix's contents, shape, dtype and column names.
+
+    Parameters
+    ----------
+    data : numpy.ndarray, scipy.sparse matrix or pandas.DataFrame
+    columns : list, optional
+        Column names of `data`
+
+    Returns
+    -------
+    str : Hex digest
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([list(columns or []), list(getattr(data, 'shape', ())), str(getattr(data, 'dtype', ''))],
+                        default=str).encode('utf-8'))
+    if hasattr(data, 'tocsr'):
+        csr = data.tocsr()
+        arrays = [csr.data, csr.indices, csr.indptr]
+    elif hasattr(data, 'columns'):
+        import pandas as pd
+        arrays = [pd.util.hash_pandas_object(data, index=False).values]
+    else:
+        arrays = [np.asarray(data)]
+    for array in arrays:
+        # Row blocks: a memory-mapped matrix is hashed without copying it whole
+        for start in range(0, max(len(array), 1), _HASH_ROWS):
+            h.update(np.ascontiguousarray(array[start:start + _HASH_ROWS]).data)
+    return h.hexdigest()
+
+
+def model_key(fingerprint: str, model_name: str, params: Dict[str, Any], random_state, **settings) -> str:
+    """
+    Store key of a model trained on `fingerprint` data.
+
+    Parameters
+    ----------
+    fingerprint : str
+        Identity of the training data (data_fingerprint or the feature cache key)
+    model_name : str
+    params : dict
+        The estimator's hyperparameters; runtime-only ones such as n_jobs are ignored
+    random_state : int
+        Random state of the train/test split
+    **settings
+        Anything else that changes the fitted model, e.g. label and test_size
+    """
+    payload = json.dumps({
+        'data': fingerprint,
+        'model': model_name,
+        'params': {k: v for k, v in params.items() if k not in RUNTIME_PARAMS},
+        'random_state': random_state,
+        'settings': settings,
+    }, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ModelStore:
+    """
+    Size-bounded on-disk store of fitted models.
+
+    Parameters
+    ----------
+    root : str, optional
+        Directory of the store (default: MMP_CACHE_DIR/models)
+    max_bytes : int, optional
+        Total size kept after each put (default: MMP_MODEL_STORE_BYTES or 1 GiB)
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root or cache_dir('models')
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str):
+        return os.path.join(self.root, f"{key}.joblib"), os.path.join(self.root, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored entry for `key`, or None on a miss.
+
+        Returns
+        -------
+        dict : {'model', 'model_name', 'label', 'feature_names', 'task', 'report', ...}
+            with the estimator's arrays memory-mapped read-only
+        """
+        import joblib
+        model_path, _ = self._paths(key)
+        try:
+            entry = joblib.load(model_path, mmap_mode='r')
+        except (OSError, EOFError, ValueError, KeyError, AttributeError, ImportError, pickle.UnpicklingError) as e:
+            if os.path.exists(model_path):
+                print(f"Could not load stored model {key}: {e}")
+            return None
+        try:
+            os.utime(model_path)  # recency for LRU eviction
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store `entry` (must hold 'model'), then evict old entries until the store fits."""
+        import joblib
+        model_path, meta_path = self._paths(key)
+        meta = {k: v for k, v in entry.items() if k not in ('model', 'report')}
+        meta.update({'key': key, 'created': time.time()})
+        try:
+            self._write_atomic(meta_path, json.dumps(meta, default=str).encode('utf-8'))
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.joblib.tmp')
+            os.close(fd)
+            try:
+                # Uncompressed, so get() can memory-map the arrays
+                joblib.dump(entry, tmp, compress=0)
+                # Written last: an entry is only served once its .joblib exists
+                os.replace(tmp, model_path)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+        except Exception as e:
+            print(f"Could not store model {key}: {e}")
+            return
+        size = os.path.getsize(model_path)
+        if size > self.max_bytes:
+            print(f"Model {key} is {size} bytes, over the store's {self.max_bytes} byte budget; "
+                  f"keeping it until the next model is stored")
+        self.evict(keep=key)
+
+    def find(self, fingerprint: str, label: Optional[str] = None,
+             model_name: Optional[str] = None) -> Optional[str]:
+        """Key of the most recently used model trained on `fingerprint`, or None."""
+        best, best_used = None, -1.0
+        for meta in self.entries():
+            if meta.get('fingerprint') != fingerprint:
+                continue
+            if label is not None and meta.get('label') != label:
+                continue
+            if model_name is not None and meta.get('model_name') != model_name:
+                continue
+            if meta['used'] > best_used:
+                best, best_used = meta['key'], meta['used']
+        return best
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Sidecar metadata of every stored model, with its size and last use."""
+        found = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.joblib'):
+                continue
+            model_path = os.path.join(self.root, name)
+            try:
+                st = os.stat(model_path)
+                with open(model_path[:-len('.joblib')] + '.json', 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            meta.update({'bytes': st.st_size, 'used': st.st_mtime})
+            found.append(meta)
+        return found
+
+    def delete(self, key: str) -> bool:
+        """Remove a stored model; True if one existed."""
+        removed = False
+        for path in self._paths(key):
+            try:
+                os.unlink(path)
+                removed = True
+            except OSError:
+                pass
+        return removed
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Drop least recently used models beyond `max_bytes`, never `keep`; returns bytes freed."""
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda meta: meta['used'])
+            total = sum(meta['bytes'] for meta in entries)
+            freed = 0
+            for meta in entries:
+                if total <= self.max_bytes:
+                    break
+                if meta['key'] == keep:
+                    continue
+                self.delete(meta['key'])
+                total -= meta['bytes']
+                freed += meta['bytes']
+            return freed
+
+    def _write_atomic(self, path: str, payload: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+
+
+_default_store: Optional[ModelStore] = None
+
+
+def get_model_store() -> ModelStore:
+    """Return the process-wide store under MMP_CACHE_DIR/models."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ModelStore()
+    return _default_store
@@ -1,42 +1,125 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from io import BytesIO
 import warnings
 import base64
-import matplotlib
-matplotlib.use('Agg')  # Use a non-interactive backend
-
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import (
-    accuracy_score, 
-    precision_score, 
-    recall_score, 
-    f1_score,
-    confusion_matrix,
-    classification_report
-)
-from sklearn.linear_model import LogisticRegression, LinearRegression, Ridge, Lasso
-from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor, GradientBoostingClassifier, GradientBoostingRegressor
-from sklearn.svm import SVC, SVR
-from sklearn.neighbors import KNeighborsClassifier, KNeighborsRegressor
-from sklearn.naive_bayes import GaussianNB
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# sklearn and matplotlib take seconds to import, so they are imported inside
+# the functions that need them instead of at module load; importing this
+# module (directly or through data_calls.dataObjectLoad) stays cheap.
+
+from analytics.estimators import make_estimator
+from analytics.metrics import MAX_CLASSES, classification_metrics, infer_task, is_continuous, regression_metrics
+from analytics.model_store import data_fingerprint, get_model_store, model_key
+from function_calls.cpu_budget import limit_threads
 
 warnings.filterwarnings('ignore')
 
+# Estimators that reject scipy.sparse input; sparse features are densified
+# for these (and only these) right before fitting
+DENSE_ONLY_MODELS = {'GaussianNB'}
+
+# Used when no model is named, by the task the label values suggest
+DEFAULT_MODELS = {'classification': 'RandomForestClassifier', 'regression': 'RandomForestRegressor'}
+
+
+def _plot_actual_vs_predicted(y, y_test, y_pred) -> str:
+    """Render the actual-vs-predicted scatter plot as a base64 PNG data URI."""
+    import matplotlib
+    matplotlib.use('Agg')  # Use a non-interactive backend
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    plt.scatter(y_test, y_pred, alpha=0.7)
+    plt.plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)  # Line for perfect prediction
+    plt.title('Actual vs Predicted')
+    plt.xlabel('Actual Values')
+    plt.ylabel('Predicted Values')
+    plt.grid()
+    
+    # Save plot to a BytesIO object
+    buf = BytesIO()
+    plt.savefig(buf, format='png')
+    plt.close()  # Close the plot to free memory
+    buf.seek(0)
+    
+    # Get the PNG data and encode it in base64
+    plot_png = base64.b64encode(buf.getvalue()).decode('utf-8')
+    return f"data:image/png;base64,{plot_png}"
+
+
+def _split_label(data, column_names: list, label_column: str):
+    """
+    Separate the label column from the features.
+
+    Returns
+    -------
+    tuple : (X, y, feature names); X stays sparse CSR for sparse data and is
+        a DataFrame otherwise, y is a pandas Series
+    """
+    import scipy.sparse as sp
+
+    if sp.issparse(data):
+        # Sparse features stay sparse; only the label column is densified
+        if label_column not in column_names:
+            raise ValueError(f"Label column '{label_column}' not found in data. Available columns: {list(column_names)}")
+        label_index = column_names.index(label_column)
+        data = data.tocsc()
+        X = data[:, [i for i in range(len(column_names)) if i != label_index]].tocsr()
+        y = pd.Series(data[:, label_index].toarray().ravel(), name=label_column)
+        feature_names = [name for name in column_names if name != label_column]
+    else:
+        # Convert to DataFrame if numpy array
+        if isinstance(data, np.ndarray):
+            df = pd.DataFrame(data, columns=column_names)
+        else:
+            df = data
+        
+        # Check if label column exists
+        if label_column not in column_names:
+            raise ValueError(f"Label column '{label_column}' not found in data. Available columns: {list(df.columns)}")
+        
+        # Separate features and target
+        X = df.drop(columns=[label_column])
+        y = df[label_column]
+        feature_names = list(X.columns)
+    return X, y, feature_names
+
+
+def _store_entry(model, model_name: str, label_column: str, feature_names: list, task: str, report: str,
+                 fingerprint: str) -> dict:
+    """What the model store keeps of a fitted model: enough to predict and to answer again."""
+    return {
+        'model': model,
+        'model_name': model_name,
+        'label': label_column,
+        'feature_names': list(feature_names),
+        'task': task,
+        'report': report,
+        'fingerprint': fingerprint,
+        'params': model.get_params(deep=False),
+    }
+
 
 def train_model(data, **kwargs):
     """
-    Train a scikit-learn model and return predictions with precision, recall, and F1 metrics.
+    Train a scikit-learn model and return its evaluation metrics.
+
+    Classifiers are reported with precision, recall, F1 and a confusion
+    matrix; regressors with MAE, RMSE, R² and an actual-vs-predicted plot.
     
     Parameters:
     -----------
-    model_name : str
-        Name of the sklearn model (e.g., 'LogisticRegression', 'RandomForestClassifier')
+    model_name : str, optional
+        Name of the sklearn model (e.g., 'LogisticRegression', 'RandomForestClassifier').
+        Defaults to RandomForestClassifier, or RandomForestRegressor when the
+        label is continuous or has more than 50 distinct values
     label_column : str
         Name of the column to use as the target variable
-    data : numpy.ndarray or pandas.DataFrame
+    data : numpy.ndarray, scipy.sparse matrix or pandas.DataFrame
         The dataset containing features and target
     column_names : list
         List of column names corresponding to the data
@@ -44,121 +127,160 @@ def train_model(data, **kwargs):
         Proportion of dataset to use as test set
     random_state : int, optional (default=42)
         Random state for reproducibility
+    model_params : dict, optional
+        Keyword arguments for the estimator (e.g. {"n_estimators": 200}),
+        typically the node's parameters; unknown names raise ValueError
+    n_jobs : int, optional
+        Parallel jobs for estimators that support them. Defaults to the
+        process's CPU budget (see function_calls/cpu_budget.py)
+    store : bool, optional (default=True)
+        Answer from the model store when this data, model, hyperparameters
+        and split were trained on before, and store newly fitted models
+    data_fingerprint : str, optional
+        Identity of `data` for the store key (DataLoader passes its feature
+        cache key); computed from the matrix contents when not given
+    compare : bool or list, optional
+        Instead of one train/test split, cross-validate several models
+        (the given names, or True for every registry model of the label's
+        task) and return them ranked; see analytics/compare.py. There
+        model_params is per model: {"SVC": {"C": 10}}
+    cv : int, optional (default=5)
+        Folds for compare mode
+    workers : int, optional
+        Processes for compare mode (defaults to the CPU budget)
         
     Returns:
     --------
     str : Formatted string containing model evaluation metrics and plot.
     """
+    import scipy.sparse as sp
+    from sklearn.model_selection import train_test_split
 
     test_size = kwargs.get('test_size', 0.2)
     random_state = kwargs.get('random_state', 42)
-    model_name = kwargs.get('model', 'RandomForestClassifier')
+    model_name = kwargs.get('model')
     column_names = kwargs.get('column', list(data[-1]))
     label_column = kwargs.get('label', column_names[-1])
     data = data[0]
     
-    # Convert to DataFrame if numpy array
-    if isinstance(data, np.ndarray):
-        df = pd.DataFrame(data, columns=column_names)
-    else:
-        df = data
-    
-    # Check if label column exists
-    if label_column not in column_names:
-        raise ValueError(f"Label column '{label_column}' not found in data. Available columns: {list(df.columns)}")
-    
-    # Separate features and target
-    X = df.drop(columns=[label_column])
-    y = df[label_column]
-    
+    X, y, feature_names = _split_label(data, column_names, label_column)
+
+    if kwargs.get('compare'):
+        # k-fold cross-validation of several registry models, ranked
+        from analytics.compare import compare_models
+        models = None if kwargs['compare'] is True else kwargs['compare']
+        return compare_models(X, y, models, label_column, cv=kwargs.get('cv', 5), random_state=random_state,
+                              model_params=kwargs.get('model_params'), workers=kwargs.get('workers'))
+
+    # Classification or regression: the label values pick the default model,
+    # the estimator's type has the final say
+    if model_name is None:
+        model_name = DEFAULT_MODELS[infer_task(y)]
+
+    # Only the named estimator is imported and built; its n_jobs follows
+    # this worker's CPU budget unless the node sets it
+    model = make_estimator(model_name, kwargs.get('model_params'), kwargs.get('n_jobs'))
+
+    # The same data, model, hyperparameters and split were trained on
+    # before: answer with the stored model's report instead of refitting
+    store = get_model_store() if kwargs.get('store', True) else None
+    if store is not None:
+        fingerprint = kwargs.get('data_fingerprint') or data_fingerprint(data, column_names)
+        key = model_key(fingerprint, model_name, model.get_params(deep=False), random_state,
+                        label=label_column, test_size=test_size)
+        stored = store.get(key)
+        if stored is not None:
+            return stored['report']
+
     # Split data into training and test sets
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=test_size, random_state=random_state
     )
+
+    from sklearn.base import is_regressor
+    if is_regressor(model):
+        task = 'regression'
+    elif is_continuous(y):
+        raise ValueError(f"Model '{model_name}' is a classifier but label '{label_column}' is continuous. "
+                         f"Use a regressor such as '{DEFAULT_MODELS['regression']}'")
+    else:
+        task = 'classification'
+
+    if sp.issparse(X_train) and model_name in DENSE_ONLY_MODELS:
+        X_train, X_test = X_train.toarray(), X_test.toarray()
     
-    # Model mapping dictionary
-    model_mapping = {
-        # Classification models
-        'LogisticRegression': LogisticRegression(max_iter=1000),
-        'DecisionTreeClassifier': DecisionTreeClassifier(),
-        'RandomForestClassifier': RandomForestClassifier(),
-        'GradientBoostingClassifier': GradientBoostingClassifier(),
-        'SVC': SVC(),
-        'KNeighborsClassifier': KNeighborsClassifier(),
-        'GaussianNB': GaussianNB(),
-        
-        # Regression models
-        'LinearRegression': LinearRegression(),
-        'Ridge': Ridge(),
-        'Lasso': Lasso(),
-        'DecisionTreeRegressor': DecisionTreeRegressor(),
-        'RandomForestRegressor': RandomForestRegressor(),
-        'GradientBoostingRegressor': GradientBoostingRegressor(),
-        'SVR': SVR(),
-        'KNeighborsRegressor': KNeighborsRegressor(),
-    }
-    
-    # Get the model
-    if model_name not in model_mapping:
-        raise ValueError(f"Model '{model_name}' not supported. Available models: {list(model_mapping.keys())}")
-    
-    model = model_mapping[model_name]
-    
-    # Train the model
-    model.fit(X_train, y_train)
-    
-    # Make predictions on test set
-    y_pred = model.predict(X_test)
-    
-    # Calculate metrics
-    accuracy = accuracy_score(y_test, y_pred)
+    # BLAS/OpenMP threads stay within the same budget as n_jobs
+    with limit_threads(kwargs.get('n_jobs')):
+        # Train the model
+        model.fit(X_train, y_train)
+
+        # Make predictions on test set
+        y_pred = model.predict(X_test)
     
+    if task == 'regression':
+        # O(n) error metrics; no confusion matrix over continuous values
+        scores = regression_metrics(y_test, y_pred)
+        summary_lines = [
+            f"**Model:** {model_name}",
+            f"**Target Column:** {label_column}",
+            f"**Training Samples:** {X_train.shape[0]}",
+            f"**Test Samples:** {X_test.shape[0]}",
+            "\n### Regression Metrics",
+            f"- **MAE:** {scores['mae']:.4f}",
+            f"- **RMSE:** {scores['rmse']:.4f}",
+            f"- **R²:** {scores['r2']:.4f}",
+            "\n### Plot",
+            f"![Actual vs Predicted]({_plot_actual_vs_predicted(y, y_test, y_pred)})",
+        ]
+        report = "\n".join(summary_lines)
+        if store is not None:
+            store.put(key, _store_entry(model, model_name, label_column, feature_names, task, report, fingerprint))
+        return report
+
     # Determine if binary or multiclass
     unique_classes = np.unique(y)
     n_classes = len(unique_classes)
+    # Past MAX_CLASSES a k x k matrix and a per-class listing would dwarf
+    # the data; the scores come from per-class counts instead
+    per_class = n_classes <= MAX_CLASSES
+
+    # Every metric below comes from one confusion matrix built in a single
+    # pass; the values and report text are the same sklearn.metrics gives
+    metrics = classification_metrics(y_test, y_pred, zero_division=0, confusion=per_class)
+    accuracy = metrics.accuracy
     
     # Calculate precision, recall, F1 for each class and overall
     if n_classes == 2:
         # Binary classification
-        precision_binary = precision_score(y_test, y_pred, average='binary', zero_division=0)
-        recall_binary = recall_score(y_test, y_pred, average='binary', zero_division=0)
-        f1_binary = f1_score(y_test, y_pred, average='binary', zero_division=0)
-        
-        precision_per_class = precision_score(y_test, y_pred, average=None, zero_division=0)
-        recall_per_class = recall_score(y_test, y_pred, average=None, zero_division=0)
-        f1_per_class = f1_score(y_test, y_pred, average=None, zero_division=0)
+        precision_binary, recall_binary, f1_binary = metrics.binary(pos_label=1)
     else:
         # Multiclass classification
         precision_binary = None
         recall_binary = None
         f1_binary = None
-        
-        precision_per_class = precision_score(y_test, y_pred, average=None, zero_division=0)
-        recall_per_class = recall_score(y_test, y_pred, average=None, zero_division=0)
-        f1_per_class = f1_score(y_test, y_pred, average=None, zero_division=0)
+
+    precision_per_class = metrics.precision
+    recall_per_class = metrics.recall
+    f1_per_class = metrics.f1
 
     # Weighted average (for both binary and multiclass)
-    precision_weighted = precision_score(y_test, y_pred, average='weighted', zero_division=0)
-    recall_weighted = recall_score(y_test, y_pred, average='weighted', zero_division=0)
-    f1_weighted = f1_score(y_test, y_pred, average='weighted', zero_division=0)
+    precision_weighted, recall_weighted, f1_weighted = metrics.average('weighted')
     
     # Macro average
-    precision_macro = precision_score(y_test, y_pred, average='macro', zero_division=0)
-    recall_macro = recall_score(y_test, y_pred, average='macro', zero_division=0)
-    f1_macro = f1_score(y_test, y_pred, average='macro', zero_division=0)
+    precision_macro, recall_macro, f1_macro = metrics.average('macro')
     
     # Confusion matrix
-    conf_matrix = confusion_matrix(y_test, y_pred)
+    conf_matrix = metrics.confusion
     
     # Classification report
-    class_report = classification_report(y_test, y_pred, zero_division=0)
+    class_report = metrics.report() if per_class else None
     
     # Build summary string
     summary_lines = []
     summary_lines.append(f"**Model:** {model_name}")
     summary_lines.append(f"**Target Column:** {label_column}")
-    summary_lines.append(f"**Training Samples:** {len(X_train)}")
-    summary_lines.append(f"**Test Samples:** {len(X_test)}")
+    summary_lines.append(f"**Training Samples:** {X_train.shape[0]}")
+    summary_lines.append(f"**Test Samples:** {X_test.shape[0]}")
     summary_lines.append(f"**Accuracy:** {accuracy:.4f}")
     
     summary_lines.append("\n### Precision, Recall, F1-Score")
@@ -174,47 +296,30 @@ def train_model(data, **kwargs):
     summary_lines.append(f"- **Macro Recall:** {recall_macro:.4f}")
     summary_lines.append(f"- **Macro F1-Score:** {f1_macro:.4f}")
     
-    summary_lines.append("\n### Per-Class Metrics")
-    for i, class_label in enumerate(unique_classes):
-        summary_lines.append(f"**Class {class_label}:**")
-        summary_lines.append(f"  - Precision: {precision_per_class[i]:.4f}")
-        summary_lines.append(f"  - Recall: {recall_per_class[i]:.4f}")
-        summary_lines.append(f"  - F1-Score: {f1_per_class[i]:.4f}")
-
-    summary_lines.append("\n### Confusion Matrix")
-    summary_lines.append(f"\n```\n{conf_matrix}\n```")
-    
-    summary_lines.append("\n### Classification Report")
-    summary_lines.append(f"\n```\n{class_report}\n```")
-
-    # Plotting if target is numeric
-    plot_png = None
-    if np.issubdtype(y.dtype, np.number):
-        plt.figure(figsize=(10, 6))
-        plt.scatter(y_test, y_pred, alpha=0.7)
-        plt.plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)  # Line for perfect prediction
-        plt.title('Actual vs Predicted')
-        plt.xlabel('Actual Values')
-        plt.ylabel('Predicted Values')
-        plt.grid()
-        
-        # Save plot to a BytesIO object
-        buf = BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close()  # Close the plot to free memory
-        buf.seek(0)
-        
-        # Get the PNG data and encode it in base64
-        plot_png = base64.b64encode(buf.getvalue()).decode('utf-8')
-        plot_png = f"data:image/png;base64,{plot_png}"
-    
-    # Append the plot to the summary if available
-    if plot_png:
-        summary_lines.append("\n### Plot")
-        summary_lines.append(f"![Actual vs Predicted]({plot_png})")
+    if not per_class:
+        summary_lines.append(f"\n{n_classes} classes: per-class metrics, confusion matrix and classification "
+                             f"report are omitted above {MAX_CLASSES} classes. If '{label_column}' is a "
+                             f"quantity, use a regressor such as '{DEFAULT_MODELS['regression']}'")
+    else:
+        summary_lines.append("\n### Per-Class Metrics")
+        # Per-class arrays follow the labels seen in y_test/y_pred
+        for i, class_label in enumerate(metrics.labels):
+            summary_lines.append(f"**Class {class_label}:**")
+            summary_lines.append(f"  - Precision: {precision_per_class[i]:.4f}")
+            summary_lines.append(f"  - Recall: {recall_per_class[i]:.4f}")
+            summary_lines.append(f"  - F1-Score: {f1_per_class[i]:.4f}")
+
+        summary_lines.append("\n### Confusion Matrix")
+        summary_lines.append(f"\n```\n{conf_matrix}\n```")
+
+        summary_lines.append("\n### Classification Report")
+        summary_lines.append(f"\n```\n{class_report}\n```")
 
     # Return the formatted summary
-    return "\n".join(summary_lines)
+    report = "\n".join(summary_lines)
+    if store is not None:
+        store.put(key, _store_entry(model, model_name, label_column, feature_names, task, report, fingerprint))
+    return report
 
 
 # Example usage with your sample data
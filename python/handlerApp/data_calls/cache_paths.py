@@ -0,0 +1,15 @@
+# data_calls/cache_paths.py
+import os
+
+# Everything derived from source files (compiled diagrams, processed
+# matrices, indexes) lives under one directory that is safe to delete.
+CACHE_ROOT = os.environ.get('MMP_CACHE_DIR') or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '.cache')
+)
+
+
+def cache_dir(*parts: str) -> str:
+    """Return `CACHE_ROOT/<parts...>`, creating it if needed."""
+    path = os.path.join(CACHE_ROOT, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,168 @@
+# data_calls/columnar.py
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+import os
+import numpy as np
+import pandas as pd
+
+from data_calls.feature_layout import DEFAULT_CHUNKSIZE, FeatureLayout, encode_chunks
+
+# pyarrow is only imported once a columnar file is actually read
+
+COLUMNAR_EXTENSIONS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'arrow',
+    '.ipc': 'arrow',
+}
+
+# Feather v2 is the Arrow IPC file format, so both share a magic and a reader
+_MAGIC = ((b'PAR1', 'parquet'), (b'ARROW1', 'arrow'))
+
+
+def detect_format(path: str) -> Optional[str]:
+    """
+    Columnar format of `path` from its extension, else from its magic bytes.
+
+    Args:
+        path: File to inspect
+
+    Returns:
+        str: 'parquet', 'feather' or 'arrow', or None for anything else
+    """
+    fmt = COLUMNAR_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt:
+        return fmt
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(8)
+    except OSError:
+        return None
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return None
+
+
+def _dataset(path: str, fmt: str):
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    # Memory-mapped: column chunks are paged in by the OS, never copied whole
+    filesystem = fs.LocalFileSystem(use_mmap=True)
+    return ds.dataset(path, format='parquet' if fmt == 'parquet' else 'ipc', filesystem=filesystem)
+
+
+def _filter_expression(filters):
+    """Accept a pyarrow expression or pq.read_table style [(col, op, value), ...] lists."""
+    if not filters or not isinstance(filters, (list, tuple)):
+        return filters or None
+    import pyarrow.parquet as pq
+    return pq.filters_to_expression(filters)
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    # A CSV read only ever yields int64/float64; Arrow keeps int32, float32,
+    # ... which _process_dataframe would otherwise drop as non-numeric
+    widened = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, np.dtype):
+            if dtype.kind in 'iu' and dtype != np.int64:
+                widened[col] = np.int64 if dtype != np.uint64 else np.float64
+            elif dtype.kind == 'f' and dtype != np.float64:
+                widened[col] = np.float64
+    return df.astype(widened) if widened else df
+
+
+def iter_columnar_batches(path: str, fmt: str, columns: Optional[Sequence[str]] = None,
+                          filters=None, batch_size: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield the rows of a Parquet/Feather/Arrow file as DataFrames.
+
+    Only `columns` are decoded, and `filters` is pushed down to the reader,
+    so Parquet row groups whose statistics rule them out are never read.
+
+    Args:
+        path: Columnar file
+        fmt: Format returned by detect_format
+        columns: Columns to project (None for all)
+        filters: pyarrow expression, or [(col, op, value), ...] as in pq.read_table
+        batch_size: Maximum rows per yielded DataFrame
+    """
+    scanner = _dataset(path, fmt).scanner(
+        columns=list(columns) if columns else None,
+        filter=_filter_expression(filters),
+        batch_size=batch_size,
+    )
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield _normalize(batch.to_pandas())
+
+
+def encode_columnar(path: str, fmt: str, columns: Optional[Sequence[str]] = None, filters=None,
+                    chunksize: int = DEFAULT_CHUNKSIZE, sparse: bool = False,
+                    compact: bool = False, dtype: Any = None) -> Tuple[Any, List[str]]:
+    """
+    Encode a columnar file into the same matrix encode_csv builds for a CSV.
+
+    Both passes stream record batches off the memory map, so peak memory is
+    the final matrix plus one batch of the projected columns.
+
+    Args:
+        path: Columnar file
+        fmt: Format returned by detect_format
+        columns: Columns to project; keep the label among them
+        filters: Row filter pushed down to the reader
+        chunksize: Rows per batch
+        sparse: Return a scipy.sparse CSR matrix instead of a dense array
+        compact: Use the smallest lossless dtype (see FeatureLayout.matrix_dtype)
+        dtype: Force the matrix dtype, e.g. 'float32'
+
+    Returns:
+        tuple: (processed matrix, list of column names)
+    """
+    layout = fit_columnar_layout(path, fmt, columns, filters, chunksize, track_ranges=compact and dtype is None)
+    matrix = transform_columnar(path, fmt, layout, columns, filters, chunksize, sparse,
+                                layout.matrix_dtype(compact, dtype), n_rows=layout.n_rows, exact=False)
+    return matrix, layout.feature_names
+
+
+def fit_columnar_layout(path: str, fmt: str, columns: Optional[Sequence[str]] = None, filters=None,
+                        chunksize: int = DEFAULT_CHUNKSIZE, track_ranges: bool = False) -> FeatureLayout:
+    """Learn the layout of a columnar file in one streaming pass."""
+    layout = FeatureLayout(track_ranges)
+    for batch in iter_columnar_batches(path, fmt, columns, filters, chunksize):
+        layout.update(batch)
+    return layout
+
+
+def transform_columnar(path: str, fmt: str, layout: FeatureLayout, columns: Optional[Sequence[str]] = None,
+                       filters=None, chunksize: int = DEFAULT_CHUNKSIZE, sparse: bool = False,
+                       dtype: Any = None, n_rows: Optional[int] = None, exact: bool = True,
+                       out: Any = None) -> Any:
+    """
+    Encode a columnar file against an already fitted layout, without refitting.
+
+    Args:
+        path: Columnar file
+        fmt: Format returned by detect_format
+        layout: Fitted layout, e.g. from FeatureLayout.from_dict
+        columns: Columns to project
+        filters: Row filter pushed down to the reader
+        chunksize: Rows per batch
+        sparse: Return a scipy.sparse CSR matrix instead of a dense array
+        dtype: Matrix dtype (defaults to layout.dtype); see encode_chunks
+        n_rows: Rows after filtering, when already known
+        exact: See FeatureLayout.encode_into
+        out: Dense matrix (or split blocks) to write into instead of allocating one
+
+    Returns:
+        The processed matrix, with columns layout.feature_names
+    """
+    if out is not None:
+        n_rows = len(out[0] if isinstance(out, tuple) else out)
+    if n_rows is None and not sparse:
+        # Answered from metadata (or a column-less scan when filtered)
+        n_rows = _dataset(path, fmt).count_rows(filter=_filter_expression(filters))
+    batches = lambda: iter_columnar_batches(path, fmt, columns, filters, chunksize)
+    return encode_chunks(layout, batches, sparse, dtype, n_rows, exact, out)
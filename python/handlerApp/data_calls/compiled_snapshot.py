@@ -0,0 +1,87 @@
+# data_calls/compiled_snapshot.py
+from typing import Any, Optional, Tuple
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+
+from data_calls.cache_paths import cache_dir
+
+# Bump whenever DiagramSnapshot/DiagramGraph change shape; older blobs are
+# then ignored and rebuilt from the JSON.
+SNAPSHOT_FORMAT = 1
+_MAGIC = 'mmp-diagram-snapshot'
+
+
+def snapshot_path(source_path: str) -> str:
+    """Where the compiled snapshot of `source_path` is stored."""
+    key = hashlib.sha1(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir('diagram'), f"{os.path.basename(source_path)}.{key}.pkl")
+
+
+def _load_body(f) -> Any:
+    # Unpickling allocates one object per node field; pausing the cyclic GC
+    # keeps it from rescanning the half-built graph over and over
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.load(f)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_compiled(source_path: str, digest: str, stat_key: Optional[Tuple[int, int]] = None) -> Optional[Any]:
+    """
+    Load the compiled snapshot for `source_path` if it is still valid.
+
+    The snapshot is only trusted when it was compiled from the same bytes:
+    an (mtime, size) match alone can miss an edit made within the
+    filesystem's timestamp granularity, and hashing the JSON costs far
+    less than parsing it.
+
+    Args:
+        source_path: The diagram JSON the snapshot was compiled from
+        digest: sha256 of the source bytes as they are now
+        stat_key: (mtime_ns, size) of the source, stored on the snapshot
+
+    Returns:
+        The stored DiagramSnapshot, or None when missing, stale or unreadable
+    """
+    try:
+        with open(snapshot_path(source_path), 'rb') as f:
+            # The small header is pickled separately so a stale blob is
+            # rejected without unpickling the whole snapshot
+            header = pickle.load(f)
+            if (not isinstance(header, dict) or header.get('magic') != _MAGIC
+                    or header.get('format') != SNAPSHOT_FORMAT or header.get('digest') != digest):
+                return None
+            snapshot = _load_body(f)
+            if stat_key is not None:
+                snapshot.stat_key = stat_key
+            return snapshot
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def write_compiled(source_path: str, snapshot: Any) -> None:
+    """Store `snapshot` (with its graph index built) next to the other caches."""
+    snapshot.graph_index  # build now so loading never has to
+    header = {
+        'magic': _MAGIC,
+        'format': SNAPSHOT_FORMAT,
+        'digest': snapshot.digest,
+        'stat_key': snapshot.stat_key,
+    }
+    path = snapshot_path(source_path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except (OSError, pickle.PicklingError):
+        # Best effort: without a snapshot the next start parses the JSON
+        if os.path.exists(tmp):
+            os.unlink(tmp)
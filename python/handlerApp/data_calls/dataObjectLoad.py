@@ -2,49 +2,231 @@
 import pandas as pd
 import numpy as np
 from typing import Tuple, List, Union, Dict, Any
-from sklearn.preprocessing import OneHotEncoder
 import os
 from io import StringIO
 import json
 import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from data_calls.getData import find_node_by_name as getNode
+from data_calls.data_registry import get_data_registry
+from data_calls.feature_layout import (
+    DEFAULT_CHUNKSIZE, FeatureLayout, LayoutMismatch, block_frame, default_nbytes, encode_chunks, fit_csv_layout,
+    matrix_dtype_name, matrix_nbytes, transform_csv,
+)
+from data_calls.feature_cache import get_feature_cache
+from data_calls.layout_store import get_layout_store
+from data_calls.columnar import detect_format, fit_columnar_layout, transform_columnar
+from data_calls.partitions import PartitionedSource, expand_partitions
+from data_calls.file_info import looks_delimited
+from data_calls.pdf_pages import is_pdf
 
 from analytics.sklearnpredictor import train_model
 
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _prefetch_pool() -> ThreadPoolExecutor:
+    """Thread pool shared by every loader's prefetch()."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                       thread_name_prefix='mmp-prefetch')
+        return _pool
+
+
+def _arrow_errors() -> Tuple[type, ...]:
+    """
+    pyarrow's errors (corrupt file, unknown column, bad filter); only imported for columnar nodes.
+
+    ArrowIOError is left out: it is OSError, which propagates as it does for CSV nodes.
+    """
+    from pyarrow.lib import ArrowException
+    return (ArrowException,)
+
+
 class DataLoader:
-    def __init__(self, trainme=True):
+    def __init__(self, trainme=True, chunksize=DEFAULT_CHUNKSIZE, cache=True, sparse=False,
+                 compact=False, dtype=None, columns=None, filters=None, reuse_layout=True, *, query=None,
+                 prefetch=False, registry=None, workers=None, text_mode='full', model=None, label=None,
+                 model_params=None, n_jobs=None, compare=None, cv=None):
         """
         Initialize DataLoader with empty mappings.
         Data sources will be added incrementally using add_data_source method.
+
+        Construction does no I/O: nothing is read or trained until
+        load_and_process_data() is called, or prefetch() starts it in the
+        background.
+
+        Arguments after reuse_layout are keyword-only.
+
+        Args:
+            trainme: Run train_model on the loaded data
+            chunksize: Rows per chunk when streaming delimited files
+            cache: Reuse processed matrices from the on-disk feature cache
+            sparse: Keep the feature matrix as scipy.sparse CSR (for
+                high-cardinality categoricals); train_model densifies it
+                only for estimators that cannot take sparse input
+            compact: Store the matrix in the smallest dtype that holds every
+                value exactly (int8/int16/..., float32 where lossless,
+                uint8 for one-hot columns). When the numeric columns need a
+                wider dtype, the matrix is a DataFrame of two blocks: the
+                numeric columns and the one-hot columns as uint8
+            dtype: Force the matrix dtype instead, e.g. 'float32'; unlike
+                compact this may round values
+            columns: Columns to read from Parquet/Feather/Arrow file nodes
+                (defaults to the node's "columns"; None reads all)
+            filters: Row filter pushed down into columnar reads, as
+                [(col, op, value), ...] (defaults to the node's "filters")
+            reuse_layout: Fit a file node's encoding once per version of
+                its file and store it; reloads of the same file skip the fit,
+                and transform() encodes new rows with the loaded layout, so
+                their columns match the data a model was trained on. A
+                replaced file is refit. Remove it with
+                get_layout_store().delete(name) to refit
+            query: Default file node (name) for load_and_process_data/prefetch
+            prefetch: Start loading `query` on the shared thread pool right away
+            registry: DataRegistry resolving file nodes (defaults to the
+                process-wide one, whose content cache is shared)
+            workers: Processes used for directory/glob file nodes and PDF
+                page extraction (defaults to the CPU count)
+            text_mode: 'full' loads a plain-text or PDF node as one string;
+                'paged' returns a TextIndex (text) or PdfDocument (PDF)
+                instead, whose page() reads only the requested slice
+            model: Estimator train_model fits, by registry name (see
+                analytics/estimators.py); defaults to one chosen from the label
+            label: Target column for train_model (defaults to the file's
+                last column; see default_label)
+            model_params: Estimator keyword arguments, e.g. from the node's
+                parameters: {"n_estimators": 200, "max_depth": 8}
+            n_jobs: Parallel jobs for the estimator (defaults to the worker's
+                CPU budget)
+            compare: Model names to cross-validate and rank instead of
+                training one model, or True/'all' for every model of the
+                label's task; model_params is then {name: {param: value}}
+                (flat when comparing a single model)
+            cv: Folds for compare (default 5)
         """
         self.data_paths = {}  # Store file paths
         self.data_aliases = {}  # Store aliases for data sources
         self.loaded_data = {}  # Store loaded data
         self.data = None
         self.trainme = trainme
-        # self.query = query
-        # load initial testing
-        self.load_and_process_data(query= 'sample_data')
-        
-        
+        self.chunksize = chunksize
+        self.sparse = sparse
+        self.compact = compact
+        self.dtype = dtype
+        self.columns = columns
+        self.filters = filters
+        self.memory_report = None  # bytes used vs. the float64 default, per load
+        self.layout = None  # FeatureLayout of the last loaded file node
+        self.fingerprint = None  # feature cache key of the last loaded matrix
+        self.cache = get_feature_cache() if cache else None
+        self.layouts = get_layout_store() if reuse_layout else None
+        self.registry = registry or get_data_registry()
+        self.workers = workers
+        if text_mode not in ('full', 'paged'):
+            raise ValueError(f"Unsupported text_mode: {text_mode!r}")
+        self.text_mode = text_mode
+        # Passed through to train_model; unset options keep its defaults
+        options = {'model': model, 'label': label, 'model_params': model_params, 'n_jobs': n_jobs,
+                   'compare': compare, 'cv': cv}
+        self.train_options = {k: v for k, v in options.items() if v is not None}
+        self.query = query
+        self._lock = threading.RLock()  # one load at a time per loader
+        self._prefetched: Dict[str, Future] = {}
+        if prefetch and query is not None:
+            self.prefetch(query)
+
 
     def train_data(self):
-        temp = train_model(self.data)
+        temp = train_model(self.data, data_fingerprint=self.fingerprint, **self._train_kwargs())
         return temp
 
-    def load_and_process_data(self, query ) -> Union[Tuple[np.ndarray, List[str]], str]:
-        self.graph = getNode(query)
-        self.load_data()
-        tmp = train_model(self.data) if self.trainme else self.data
-        # yield str(tmp)
-        print(tmp)
-        return tmp
+    def _train_kwargs(self) -> Dict[str, Any]:
+        options = dict(self.train_options)
+        if 'label' not in options:
+            label = self.default_label()
+            if label is not None:
+                options['label'] = label
+        return options
+
+    def default_label(self):
+        """
+        Label used when none is given: the loaded file's last column.
+
+        Returns:
+            str: The column, or None when no layout is loaded (train_model
+            then picks the matrix's last column)
+
+        Raises:
+            ValueError: The last column is categorical (or dropped), so the
+                matrix only holds its one-hot indicator columns, which are
+                no label
+        """
+        if self.layout is None:
+            return None
+        label = self.layout.default_label
+        if label is None:
+            last = self.layout.columns[-1] if self.layout.columns else None
+            raise ValueError(f"Give a label: the last column {last!r} is not numeric, so the matrix has "
+                             f"no column of its own for it. Numeric columns: {self.layout.numeric_columns}")
+        return label
+
+    def prefetch(self, query=None) -> Future:
+        """
+        Load (and train on) a node in the background.
+
+        Args:
+            query: File node name; defaults to the loader's query
+
+        Returns:
+            Future: Poll with done() or wait with result(); the next
+            load_and_process_data(query) call picks up its result
+        """
+        query = self._query(query)
+        with self._lock:
+            future = self._prefetched.get(query)
+            if future is None:
+                future = _prefetch_pool().submit(self._load_and_process, query)
+                self._prefetched[query] = future
+        return future
+
+    def load_and_process_data(self, query=None) -> Union[Tuple[np.ndarray, List[str]], str]:
+        query = self._query(query)
+        with self._lock:
+            future = self._prefetched.pop(query, None)
+        if future is not None:
+            return future.result()
+        return self._load_and_process(query)
+
+    def _query(self, query):
+        query = query if query is not None else self.query
+        if query is None:
+            raise ValueError("No query given and the loader has no default query")
+        return query
+
+    def _load_and_process(self, query):
+        with self._lock:
+            # File nodes by name, alias or id; other nodes by name as before
+            self.graph = self.registry.resolve(query) or getNode(query)
+            self.load_data()
+            # Text, paged text and load errors have nothing to train on
+            untrainable = isinstance(self.data, tuple) and self.data[-1] in ('paged', 'text', 'error')
+            trainable = self.trainme and not untrainable
+            tmp = train_model(self.data, data_fingerprint=self.fingerprint, **self._train_kwargs()) if trainable else self.data
+            if trainable:
+                print(tmp)
+            return tmp
 
     def load_data(self) -> Union[Tuple[np.ndarray, List[str]], str]:
         # Check if input is a known shape ID or alias
         shape_config = self.graph.copy()
+        self.fingerprint = None
 
         if shape_config.get('type') != 'file':
             return False
@@ -68,22 +250,177 @@ class DataLoader:
         
         # Get content
         # if is_file:
-        filepath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-        filepath = '/'.join(filepath.split(os.sep)) + '/'
-        filepath +=  file_path
-        with open(filepath if isinstance(file_path, str) else input_identifier, 'r', encoding='utf-8') as file:
-            content = file.read()
-        # else:
-        #     content = input_identifier
-            
-        # Store in loaded_data if it's from a known shape
-        # if input_identifier in self.data_paths or input_identifier in self.data_aliases:
-        #     self.loaded_data[input_identifier] = content
+        filepath = self.registry.path(shape_config)
+        columns = self.columns if self.columns is not None else shape_config.get('columns')
+        filters = self.filters if self.filters is not None else shape_config.get('filters')
 
-        # Process content
-        self.data = self._process_content(content)
+        # A directory or glob: every partition is encoded in its own process
+        partitions = expand_partitions(filepath)
+        if partitions is not None:
+            if not partitions:
+                self.data = f"No partition files match {file_path}", 'error'
+                return
+            source = PartitionedSource(partitions, self.chunksize, columns, filters, self.workers)
+            self._load_cached(
+                partitions,
+                f"{shape_id}|{json.dumps(columns)}",
+                source.fit,
+                lambda layout, dtype, n_rows, exact: source.transform(layout, dtype, exact, self.sparse),
+                {'partitions': len(partitions), 'columns': columns, 'filters': filters},
+                _arrow_errors() if detect_format(partitions[0]) else (),
+            )
+            return
+
+        # Columnar files are scanned off a memory map, projected and filtered
+        fmt = detect_format(filepath)
+        if fmt:
+            self._load_cached(
+                filepath,
+                f"{shape_id}|{json.dumps(columns)}",
+                lambda track: fit_columnar_layout(filepath, fmt, columns, filters, self.chunksize, track),
+                lambda layout, dtype, n_rows, exact: transform_columnar(
+                    filepath, fmt, layout, columns, filters, self.chunksize, self.sparse, dtype, n_rows, exact),
+                {'format': fmt, 'columns': columns, 'filters': filters},
+                _arrow_errors(),
+            )
+            return
+
+        # PDFs are extracted page by page in a process pool, once per file hash
+        if is_pdf(filepath):
+            if self.text_mode == 'paged':
+                self.data = self.registry.pdf(filepath, self.workers), 'paged'
+            else:
+                self.data = self.registry.read_path(filepath), 'text'
+            return
+
+        # Delimited files are parsed straight from disk in chunks; only plain
+        # text is read into memory as a string, or served page by page
+        if not self._looks_delimited(filepath):
+            if self.text_mode == 'paged':
+                self.data = self.registry.text_index(filepath), 'paged'
+            else:
+                self.data = self.registry.read_path(filepath), 'text'
+            return
+
+        self._load_cached(
+            filepath,
+            shape_id,
+            lambda track: fit_csv_layout(filepath, self.chunksize, track)[0],
+            lambda layout, dtype, n_rows, exact: transform_csv(
+                filepath, layout, self.chunksize, self.sparse, dtype, n_rows, exact),
+        )
         # return self.data
-    
+
+    def _load_cached(self, filepath: Union[str, List[str]], layout_key: str, fit, transform,
+                     extra_settings: Dict[str, Any] = None, errors: Tuple[type, ...] = ()) -> None:
+        """
+        Set self.data from the feature cache, or encode the source on a miss.
+
+        The node's stored layout is reused when there is one; otherwise the
+        source is fitted and the layout stored for the next load.
+
+        Args:
+            filepath: Source file (or partition files), hashed into the cache key
+            layout_key: Name the node's layout is stored under
+            fit: fit(track_ranges) -> FeatureLayout
+            transform: transform(layout, dtype, n_rows, exact) -> matrix
+            extra_settings: Source-specific settings that change the output
+            errors: Source-specific exceptions reported as an 'error' load
+                instead of raised, e.g. pyarrow's for columnar files
+        """
+        # A layout is reused for the file it was fitted on; once the node's
+        # file is replaced, the new contents are refit
+        source = (self.cache or get_feature_cache()).source_digest(filepath) if self.layouts else None
+        stored = self.layouts.get(layout_key, source) if self.layouts else None
+        settings = dict(self._encoding_settings(), **(extra_settings or {}))
+        settings['layout'] = stored.fingerprint if stored else None
+        key = self.cache.key(filepath, settings) if self.cache else None
+        # Identifies the matrix for the model store without hashing it again
+        self.fingerprint = key
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            self.data = cached
+            self.layout = stored
+            self._report_memory()
+            return
+
+        try:
+            layout, n_rows = stored, None
+            if layout is None:
+                layout = fit(self.compact and self.dtype is None)
+                n_rows = layout.n_rows
+                if self.layouts:
+                    self.layouts.put(layout_key, layout, source)
+                    if key:
+                        # What the next load's key will be, once it finds this layout
+                        self.fingerprint = self.cache.key(filepath, dict(settings, layout=layout.fingerprint))
+            try:
+                matrix = transform(layout, layout.matrix_dtype(self.compact, self.dtype), n_rows,
+                                   self.dtype is None)
+            except LayoutMismatch:
+                # New rows outgrew the dtype picked when the layout was fitted
+                matrix = transform(layout, np.dtype('float64'), n_rows, False)
+            self.layout = layout
+            self.data = matrix, layout.feature_names
+        except (pd.errors.EmptyDataError, pd.errors.ParserError) + tuple(errors) as e:
+            self.data = str(e), 'error'
+            return
+        self._report_memory()
+        if key:
+            self.cache.put(key, *self.data)
+
+    def transform(self, df: pd.DataFrame) -> Tuple[Any, List[str]]:
+        """
+        Encode new rows with the layout of the last loaded file node.
+
+        Nothing is refit: the columns match the loaded matrix, categories
+        the layout has not seen encode as zeros and missing columns as NaN.
+
+        Args:
+            df: New rows, e.g. for inference
+
+        Returns:
+            tuple: (processed matrix, list of column names)
+        """
+        if self.layout is None:
+            raise ValueError("No fitted layout; load a delimited or columnar file node first")
+        layout = self.layout
+        try:
+            matrix = encode_chunks(layout, lambda: [df], self.sparse,
+                                   layout.matrix_dtype(self.compact, self.dtype), len(df), self.dtype is None)
+        except LayoutMismatch:
+            matrix = encode_chunks(layout, lambda: [df], self.sparse, np.dtype('float64'), len(df))
+        return matrix, layout.feature_names
+
+    def _encoding_settings(self) -> Dict[str, Any]:
+        """Everything that changes the processed matrix, for the cache key."""
+        return {'encoding': 'onehot', 'version': 1, 'sparse': self.sparse,
+                'compact': self.compact, 'dtype': str(np.dtype(self.dtype)) if self.dtype else None}
+
+    def _report_memory(self) -> None:
+        """Record in memory_report how much the matrix saves over float64."""
+        matrix = self.data[0]
+        used, baseline = matrix_nbytes(matrix), default_nbytes(matrix)
+        self.memory_report = {
+            'dtype': matrix_dtype_name(matrix),
+            'bytes': used,
+            'float64_bytes': baseline,
+            'bytes_saved': baseline - used,
+        }
+
+    def _looks_delimited(self, filepath: str, n_lines: int = 5) -> bool:
+        """
+        Same test _process_content applies, run on the first lines only.
+
+        Args:
+            filepath: Path of the file to sniff
+            n_lines: Number of leading lines to check for a delimiter
+
+        Returns:
+            bool: False when the file should be treated as plain text
+        """
+        return looks_delimited(filepath, n_lines)
+
     def _process_content(self, content: str) -> Union[Tuple[np.ndarray, List[str]], str]:
         """
         Process the content and determine if it's CSV or text.
@@ -113,6 +450,9 @@ class DataLoader:
     def _process_dataframe(self, df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
         """
         Process a DataFrame with one-hot encoding for categorical columns.
+
+        Always fits the frame's own columns; to encode rows with the layout
+        of a loaded file node, call transform() instead.
         
         Args:
             df: pandas DataFrame to process
@@ -134,7 +474,8 @@ class DataLoader:
             final_columns.extend(numeric_cols.tolist())
         
         if len(categorical_cols) > 0:
-            encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+            from sklearn.preprocessing import OneHotEncoder  # deferred: sklearn import is slow
+            encoder = OneHotEncoder(sparse_output=self.sparse, handle_unknown='ignore')
             categorical_data = df[categorical_cols].values
             if len(categorical_data.shape) == 1:
                 categorical_data = categorical_data.reshape(-1, 1)
@@ -147,6 +488,26 @@ class DataLoader:
             
             processed_data.append(categorical_data)
         
+        target = None
+        if processed_data and (self.compact or self.dtype):
+            layout = FeatureLayout(track_ranges=self.dtype is None)
+            layout.update(df)
+            target = layout.matrix_dtype(self.compact, self.dtype)
+
+        if processed_data and self.sparse:
+            # Numeric block joins the CSR one-hot block without densifying it
+            import scipy.sparse as sp
+            if isinstance(target, tuple):
+                target = np.result_type(*target)
+            final_data = sp.hstack([sp.csr_matrix(arr) for arr in processed_data], format='csr')
+            return (final_data.astype(target) if target is not None else final_data), final_columns
+
+        if isinstance(target, tuple):
+            # Split matrix: the one-hot block stays uint8 next to the numeric block
+            numeric_data, categorical_data = processed_data
+            return block_frame([np.asarray(numeric_data).reshape(len(df), -1).astype(target[0]),
+                                categorical_data.astype(target[1])], final_columns), final_columns
+
         if processed_data:
             processed_data = [arr if len(arr.shape) == 2 else arr.reshape(-1, 1) 
                              for arr in processed_data]
@@ -156,6 +517,8 @@ class DataLoader:
             
         if len(final_data.shape) == 1:
             final_data = final_data.reshape(-1, 1)
+        if target is not None:
+            final_data = final_data.astype(target, copy=False)
         # print(final_data, final_columns)
         
         return final_data, final_columns
@@ -163,6 +526,39 @@ class DataLoader:
     
     
 
+# Parameters the load_and_process_data node declares besides query; the
+# model fills them in, so nothing else (registry, cache, workers, ...) may
+# reach DataLoader from a function call
+NODE_OPTIONS = ('model', 'label', 'model_params', 'compare', 'cv')
+
+
+def load_and_process_data(query: str, **options) -> Any:
+    """
+    Entry point of the load_and_process_data diagram node.
+
+    Constructing a DataLoader does no I/O, so the node calls this function
+    rather than the class: it loads `query` and returns what the model
+    should see.
+
+    Args:
+        query: File node name, alias or id
+        **options: The node's other parameters, NODE_OPTIONS
+
+    Returns:
+        str: The training report (or comparison table), or the file's text
+        for text nodes; other loads return what DataLoader returns
+
+    Raises:
+        ValueError: For a parameter the node does not declare
+    """
+    unknown = sorted(set(options) - set(NODE_OPTIONS))
+    if unknown:
+        raise ValueError(f"load_and_process_data does not accept {unknown}. Parameters: {['query', *NODE_OPTIONS]}")
+    result = DataLoader(**options).load_and_process_data(query)
+    if isinstance(result, tuple) and len(result) == 2 and result[-1] in ('text', 'error'):
+        return result[0]
+    return result
+
 
 if __name__ == "__main__":
-    DataLoader()
+    DataLoader().load_and_process_data('sample_data')
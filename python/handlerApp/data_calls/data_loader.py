@@ -1,21 +1,50 @@
 # data_operations/data_loader.py
 import pandas as pd
 import numpy as np
-from typing import Tuple, List, Union, Dict, Any
-from sklearn.preprocessing import OneHotEncoder
+from typing import Tuple, List, Optional, Union, Dict, Any
 import os
 from io import StringIO
 import json
+import sys
+from pandas.api.types import pandas_dtype
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_calls.data_registry import DataRegistry, get_data_registry
+from data_calls.file_info import describe_file
+from data_calls.pdf_pages import is_pdf
+from data_calls.text_index import DEFAULT_PAGE_LINES
 
 class DataLoader:
-    def __init__(self):
+    def __init__(self, registry: Optional[DataRegistry] = None):
         """
-        Initialize DataLoader with empty mappings.
-        Data sources will be added incrementally using add_data_source method.
+        Initialize DataLoader over the shared data registry.
+        Data sources from the diagram are available right away; more can be
+        added with add_data_source.
+
+        Args:
+            registry: DataRegistry to use (defaults to the process-wide one)
         """
-        self.data_paths = {}  # Store file paths
-        self.data_aliases = {}  # Store aliases for data sources
-        self.loaded_data = {}  # Store loaded data
+        self.registry = registry or get_data_registry()
+
+    @property
+    def data_paths(self) -> Dict[str, str]:
+        """File node name -> importPath.module."""
+        return {n['name']: (n.get('importPath') or {}).get('module', '') for n in self.registry.file_nodes()}
+
+    @property
+    def data_aliases(self) -> Dict[str, str]:
+        """Alias -> file node name."""
+        aliases = {}
+        for node in self.registry.file_nodes():
+            alias = (node.get('importPath') or {}).get('aliases')
+            if alias and alias not in aliases:
+                aliases[alias] = node['name']
+        return aliases
+
+    @property
+    def loaded_data(self) -> Dict[str, str]:
+        """Contents currently held by the registry's bounded cache, by path."""
+        return {key[0]: content for key, content in self.registry.content.items()}
         
     def add_data_source(self, shape_config: Dict[str, Any]) -> bool:
         """
@@ -39,28 +68,20 @@ class DataLoader:
         """
         # print('shape_config :', shape_config)
         try:
-            if shape_config.get('type') != 'file':
-                return False
-                
-            shape_id = shape_config.get('name')
-            import_path = shape_config.get('importPath', {})
-            file_path = import_path.get('module', '')
-            aliases = import_path.get('aliases', '')
-            
-            if not shape_id or not file_path:
-                return False
-            
-            # Add to mappings
-            self.data_paths[shape_id] = file_path
-            if aliases:
-                self.data_aliases[aliases] = shape_id
-                
-            return True
-            
+            return self.registry.register(shape_config)
         except Exception as e:
             print(f"Error adding data source: {e}")
             return False
 
+    def _resolve_path(self, input_identifier: str) -> Optional[str]:
+        """Path behind a node name, alias or id, or the identifier itself if it is a file."""
+        node = self.registry.resolve(input_identifier)
+        if node is not None:
+            return self.registry.path(node)
+        if isinstance(input_identifier, str) and os.path.isfile(input_identifier):
+            return input_identifier
+        return None
+
     def load_and_process_data(self, query: str) -> Union[Tuple[np.ndarray, List[str]], str]:
         """
         Load and process data using either a shape ID, alias, or direct input.
@@ -72,29 +93,11 @@ class DataLoader:
             If CSV: tuple (numpy array of processed data, list of column names)
             If text: content of the file or the original string
         """
-        # Check if input is a known shape ID or alias
-        input_identifier = query
-        if input_identifier in self.data_paths:
-            file_path = self.data_paths[input_identifier]
-        elif input_identifier in self.data_aliases:
-            shape_id = self.data_aliases[input_identifier]
-            file_path = self.data_paths[shape_id]
-        else:
-            file_path = input_identifier
-            
-        # Check if input is a file path
-        is_file = os.path.isfile(file_path if isinstance(file_path, str) else input_identifier)
-        
-        # Get content
-        if is_file:
-            with open(file_path if isinstance(file_path, str) else input_identifier, 'r', encoding='utf-8') as file:
-                content = file.read()
-        else:
-            content = input_identifier
-            
-        # Store in loaded_data if it's from a known shape
-        if input_identifier in self.data_paths or input_identifier in self.data_aliases:
-            self.loaded_data[input_identifier] = content
+        file_path = self._resolve_path(query)
+        # File contents come from the registry's byte-bounded LRU cache
+        content = self.registry.read_path(file_path) if file_path else query
+        if file_path and is_pdf(file_path):
+            return content, 'text'  # extracted page text, never a table
 
         # Process content
         return self._process_content(content)
@@ -149,6 +152,7 @@ class DataLoader:
             final_columns.extend(numeric_cols.tolist())
         
         if len(categorical_cols) > 0:
+            from sklearn.preprocessing import OneHotEncoder  # deferred: sklearn import is slow
             encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
             categorical_data = df[categorical_cols].values
             if len(categorical_data.shape) == 1:
@@ -175,6 +179,35 @@ class DataLoader:
         return final_data, final_columns
 
     
+    def read_page(self, query: str, page: int = 0, page_lines: int = DEFAULT_PAGE_LINES) -> Dict[str, Any]:
+        """
+        One page of a text or PDF data source, read without loading the whole file.
+
+        Args:
+            query: Shape ID, alias or file path
+            page: 0-based page number
+            page_lines: Lines per page (text files; PDFs use their own pages)
+
+        Returns:
+            dict: The page text plus page and pages, and for text files the
+            lines and paragraphs counts
+        """
+        file_path = self._resolve_path(query)
+        if not file_path:
+            raise KeyError(f"No file node or file {query!r}")
+        if is_pdf(file_path):
+            # One page is extracted in this process; no pool is started for it
+            document = self.registry.pdf(file_path, workers=1)
+            return {"text": document.page(page), "page": page, "pages": document.page_count}
+        index = self.registry.text_index(file_path)
+        return {
+            "text": index.page(page, page_lines),
+            "page": page,
+            "pages": index.page_count(page_lines),
+            "lines": index.line_count,
+            "paragraphs": index.paragraph_count,
+        }
+
     def get_data_info(self, input_identifier: str) -> dict:
         """
         Get information about the data source.
@@ -186,22 +219,17 @@ class DataLoader:
             dict: Information about the data
         """
         # Get content using the same logic as load_and_process_data
-        if input_identifier in self.data_paths:
-            file_path = self.data_paths[input_identifier]
-        elif input_identifier in self.data_aliases:
-            shape_id = self.data_aliases[input_identifier]
-            file_path = self.data_paths[shape_id]
-        else:
-            file_path = input_identifier
-            
-        is_file = os.path.isfile(file_path if isinstance(file_path, str) else input_identifier)
+        file_path = self._resolve_path(input_identifier)
         
-        if is_file:
-            with open(file_path if isinstance(file_path, str) else input_identifier, 'r', encoding='utf-8') as file:
-                content = file.read()
-        else:
-            content = input_identifier
+        if file_path:
+            # Header, a sample of rows and a newline count; never a full parse
+            info = describe_file(file_path)
+            if info.get("column_types") is not None:
+                info["column_types"] = {col: pandas_dtype(dtype) for col, dtype in info["column_types"].items()}
+            info.update(source="file", identifier=input_identifier)
+            return info
 
+        content = input_identifier
         try:
             df = pd.read_csv(StringIO(content))
             return {
@@ -209,14 +237,14 @@ class DataLoader:
                 "rows": len(df),
                 "columns": len(df.columns),
                 "column_types": dict(df.dtypes),
-                "source": "file" if is_file else "text",
+                "source": "text",
                 "identifier": input_identifier
             }
         except:
             return {
                 "type": "text",
                 "length": len(content),
-                "source": "file" if is_file else "text",
+                "source": "text",
                 "first_line": content.split('\n')[0] if content else "",
                 "identifier": input_identifier
             }
@@ -226,10 +254,30 @@ class DataLoader:
         Get all available data sources and their aliases.
         
         Returns:
-            dict: Mapping of aliases to shape IDs
+            dict: Mapping of aliases to shape IDs, plus content cache counters
         """
         return {
             "paths": self.data_paths,
-            "aliases": self.data_aliases
+            "aliases": self.data_aliases,
+            "cache": self.registry.stats()
         }
 
+
+def read_page(query: str, page: int = 0, page_lines: int = DEFAULT_PAGE_LINES) -> Dict[str, Any]:
+    """
+    Entry point of the read_page diagram node.
+
+    Large text and PDF nodes are read a page at a time instead of being
+    returned whole, so the model asks for the page count first and then
+    the pages it needs. Text pages come from the file's line index; PDF
+    pages are the document's own, extracted once and cached by file hash.
+
+    Args:
+        query: File node name, alias or id, or a file path
+        page: 0-based page number
+        page_lines: Lines per page (text files only)
+
+    Returns:
+        dict: See DataLoader.read_page
+    """
+    return DataLoader().read_page(query, int(page), int(page_lines))
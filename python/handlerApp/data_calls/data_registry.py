@@ -0,0 +1,238 @@
+# data_calls/data_registry.py
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import os
+import threading
+
+from data_calls.diagram_registry import DiagramRegistry, get_registry
+from data_calls.pdf_pages import PdfDocument, is_pdf
+from data_calls.text_index import TextIndex, open_text_index
+
+HANDLER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_CONTENT_BYTES = int(os.environ.get('MMP_CONTENT_CACHE_BYTES', 256 * 1024 ** 2))
+
+
+class ContentCache:
+    """
+    LRU cache bounded by the total size of its values, not their count.
+
+    Entries larger than the whole budget are not cached at all.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CONTENT_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: int) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self.nbytes -= size
+                self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._entries)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """(key, value) pairs, least recently used first; does not count as use."""
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class DataRegistry:
+    """
+    Every `type: "file"` node, resolvable by name, alias or id.
+
+    Nodes come from the diagram (re-indexed whenever the DiagramRegistry
+    loads a new version) plus any registered at runtime with `register`.
+    File contents are kept in a byte-bounded LRU cache keyed by path, mtime
+    and size, so an edited file is re-read and a long-running backend
+    holds at most `max_bytes` of source text.
+    """
+
+    def __init__(self, diagram: Optional[DiagramRegistry] = None, max_bytes: int = DEFAULT_CONTENT_BYTES,
+                 base_dir: str = HANDLER_DIR):
+        self.diagram = diagram or get_registry()
+        self.base_dir = base_dir
+        self.content = ContentCache(max_bytes)
+        self._registered: Dict[str, Dict[str, Any]] = {}
+        self._registered_index: Dict[str, Dict[str, Any]] = {}
+        self._diagram_index: Dict[str, Dict[str, Any]] = {}
+        self._indexed_digest: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index(nodes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        # Same precedence as DiagramRegistry.resolve: name, then alias, then id;
+        # the first node wins within each
+        index: Dict[str, Dict[str, Any]] = {}
+        for field in ('id', 'alias', 'name'):
+            for node in reversed(nodes):
+                if field == 'alias':
+                    value = (node.get('importPath') or {}).get('aliases')
+                else:
+                    value = node.get(field)
+                if value:
+                    index[value] = node
+        return index
+
+    def _file_index(self) -> Dict[str, Dict[str, Any]]:
+        snapshot = self.diagram.snapshot()
+        if snapshot.digest != self._indexed_digest:
+            with self._lock:
+                if snapshot.digest != self._indexed_digest:
+                    self._diagram_index = self._index([n for n in snapshot.nodes if n.get('type') == 'file'])
+                    self._indexed_digest = snapshot.digest
+        return self._diagram_index
+
+    def register(self, shape_config: Dict[str, Any]) -> bool:
+        """
+        Add a file node that is not in the diagram.
+
+        Args:
+            shape_config: Node dict with type "file", a name and importPath.module
+
+        Returns:
+            bool: True if the node was registered
+        """
+        if shape_config.get('type') != 'file':
+            return False
+        name = shape_config.get('name')
+        if not name or not (shape_config.get('importPath') or {}).get('module'):
+            return False
+        with self._lock:
+            self._registered[name] = dict(shape_config)
+            self._registered_index = self._index(list(self._registered.values()))
+        return True
+
+    def file_nodes(self) -> List[Dict[str, Any]]:
+        """Registered nodes first, then the diagram's file nodes."""
+        seen = set(self._registered)
+        diagram_nodes = [n for n in self.diagram.snapshot().nodes
+                         if n.get('type') == 'file' and n.get('name') not in seen]
+        return list(self._registered.values()) + diagram_nodes
+
+    def resolve(self, key: str) -> Optional[Dict[str, Any]]:
+        """File node by name, alias or id; registered nodes take precedence."""
+        return self._registered_index.get(key) or self._file_index().get(key)
+
+    def path(self, node: Dict[str, Any]) -> str:
+        """
+        Absolute path of a file node.
+
+        `importPath.module` is relative to the handlerApp directory, as in
+        the diagram; paths that only exist relative to the working directory
+        are accepted for nodes registered at runtime.
+        """
+        module = (node.get('importPath') or {}).get('module', '')
+        if os.path.isabs(module):
+            return module
+        candidate = os.path.join(self.base_dir, module)
+        if not os.path.exists(candidate) and os.path.exists(module):
+            return os.path.abspath(module)
+        return os.path.abspath(candidate)
+
+    def read(self, key: str) -> str:
+        """Text of the file node `key`; raises KeyError for an unknown node."""
+        node = self.resolve(key)
+        if node is None:
+            raise KeyError(f"No file node with name, alias or id {key!r}")
+        return self.read_path(self.path(node))
+
+    def read_path(self, path: str) -> str:
+        """
+        Text of `path`, served from the content cache while the file is unchanged.
+
+        PDFs are returned as their extracted text, pages separated by form feeds.
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        cache_key = (path, st.st_mtime_ns, st.st_size)
+        content = self.content.get(cache_key)
+        if content is None:
+            if is_pdf(path):
+                content = self.pdf(path).text()
+            else:
+                with open(path, 'r', encoding='utf-8') as file:
+                    content = file.read()
+            # Older versions of the same file can never be hit again
+            for key in self.content.keys():
+                if key[0] == path and key != cache_key:
+                    self.content.discard(key)
+            self.content.put(cache_key, content, st.st_size)
+        return content
+
+    def text_index(self, path: str) -> TextIndex:
+        """
+        Paged access to `path` without reading it into the content cache.
+
+        The line/paragraph offsets are built once per file version and kept
+        on disk; reads slice a memory map of the file.
+        """
+        return open_text_index(path)
+
+    def pdf(self, path: str, workers: Optional[int] = None) -> PdfDocument:
+        """Page-level access to a PDF; extracted pages are cached on disk by file hash."""
+        return PdfDocument(path, workers)
+
+    def stats(self) -> Dict[str, int]:
+        """Content cache counters: entries, bytes, max_bytes, hits, misses, evictions."""
+        return self.content.stats()
+
+
+_default_registry: Optional[DataRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_data_registry() -> DataRegistry:
+    """Return the process-wide registry over the default diagram."""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = DataRegistry()
+        return _default_registry
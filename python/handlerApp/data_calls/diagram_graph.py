@@ -0,0 +1,99 @@
+# data_calls/diagram_graph.py
+from collections import deque
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+# Node types that can be called as functions from a handler
+FUNCTION_TYPES = ('function', 'data_calls')
+
+
+class DiagramGraph:
+    """
+    Adjacency and reachability index over a diagram's `edges`.
+
+    Built once per diagram version; every query afterwards is a dict lookup.
+    Edges that point at unknown node ids are ignored and duplicates are
+    collapsed.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]):
+        self.node_types: Dict[str, str] = {}
+        for n in nodes:
+            if n.get('id') is not None:
+                self.node_types.setdefault(n['id'], n.get('type'))
+
+        children: Dict[str, List[str]] = {node_id: [] for node_id in self.node_types}
+        parents: Dict[str, List[str]] = {node_id: [] for node_id in self.node_types}
+        seen = set()
+        for e in edges:
+            source, target = e.get('source'), e.get('target')
+            if source not in children or target not in children or (source, target) in seen:
+                continue
+            seen.add((source, target))
+            children[source].append(target)
+            parents[target].append(source)
+
+        self.children: Dict[str, Tuple[str, ...]] = {k: tuple(v) for k, v in children.items()}
+        self.parents: Dict[str, Tuple[str, ...]] = {k: tuple(v) for k, v in parents.items()}
+        self.topological_order, self.has_cycle = self._toposort()
+        self.position: Dict[str, int] = {n: i for i, n in enumerate(self.topological_order)}
+        self._reachable = self._build_reachable()
+
+    def _toposort(self) -> Tuple[List[str], bool]:
+        """Kahn's algorithm; nodes caught in a cycle are appended in diagram order."""
+        in_degree = {node_id: len(p) for node_id, p in self.parents.items()}
+        queue = deque(node_id for node_id, d in in_degree.items() if d == 0)
+        order = []
+        while queue:
+            node_id = queue.popleft()
+            order.append(node_id)
+            for child in self.children[node_id]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    queue.append(child)
+
+        has_cycle = len(order) < len(self.node_types)
+        if has_cycle:
+            placed = set(order)
+            order.extend(node_id for node_id in self.node_types if node_id not in placed)
+        return order, has_cycle
+
+    def _build_reachable(self) -> Dict[str, FrozenSet[str]]:
+        if self.has_cycle:
+            return {node_id: self._walk(node_id) for node_id in self.node_types}
+
+        # Children come after parents in topological order, so walking it
+        # backwards lets every node reuse its children's finished sets.
+        reachable: Dict[str, FrozenSet[str]] = {}
+        for node_id in reversed(self.topological_order):
+            acc = set()
+            for child in self.children[node_id]:
+                if self.node_types[child] in FUNCTION_TYPES:
+                    acc.add(child)
+                acc |= reachable[child]
+            reachable[node_id] = frozenset(acc)
+        return reachable
+
+    def _walk(self, start: str) -> FrozenSet[str]:
+        found, visited = set(), {start}
+        queue = deque([start])
+        while queue:
+            for child in self.children[queue.popleft()]:
+                if child in visited:
+                    continue
+                visited.add(child)
+                queue.append(child)
+                if self.node_types[child] in FUNCTION_TYPES:
+                    found.add(child)
+        return frozenset(found)
+
+    def children_of(self, node_id: str) -> Tuple[str, ...]:
+        """Return the ids of nodes directly connected below `node_id`."""
+        return self.children.get(node_id, ())
+
+    def parents_of(self, node_id: str) -> Tuple[str, ...]:
+        """Return the ids of nodes directly connected above `node_id`."""
+        return self.parents.get(node_id, ())
+
+    def reachable_functions(self, node_id: str) -> FrozenSet[str]:
+        """Return the ids of every function node reachable from `node_id`."""
+        return self._reachable.get(node_id, frozenset())
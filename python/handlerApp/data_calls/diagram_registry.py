@@ -0,0 +1,274 @@
+# data_calls/diagram_registry.py
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import stat
+import threading
+
+from data_calls.compiled_snapshot import read_compiled, write_compiled
+from data_calls.diagram_graph import DiagramGraph
+
+# <repo>/data/diagram.json, resolved the same way getData always has
+DEFAULT_DIAGRAM_PATH = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')),
+    'data', 'diagram.json'
+)
+
+
+class DiagramSnapshot:
+    """
+    One parsed version of diagram.json with its lookup indexes.
+
+    The indexes are never mutated after they are built, so callers that
+    grabbed a snapshot keep a consistent view even if the registry reloads
+    underneath them.
+    """
+
+    def __init__(self, graph: Dict[str, Any], digest: str, stat_key: Tuple[int, int]):
+        self.graph = graph
+        self.digest = digest
+        self.stat_key = stat_key
+        self.nodes: List[Dict[str, Any]] = graph.get('nodes', [])
+        self.edges: List[Dict[str, Any]] = graph.get('edges', [])
+
+        # First occurrence wins, matching the old linear scan
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_alias: Dict[str, Dict[str, Any]] = {}
+        for n in self.nodes:
+            if n.get('name') is not None:
+                self.by_name.setdefault(n['name'], n)
+            if n.get('id') is not None:
+                self.by_id.setdefault(n['id'], n)
+            alias = (n.get('importPath') or {}).get('aliases')
+            if alias:
+                self.by_alias.setdefault(alias, n)
+
+        self._graph_index: Optional[DiagramGraph] = None
+        self._graph_lock = threading.Lock()
+
+    @property
+    def graph_index(self) -> DiagramGraph:
+        """Adjacency/reachability index, built on first use for this version."""
+        if self._graph_index is None:
+            with self._graph_lock:
+                if self._graph_index is None:
+                    self._graph_index = DiagramGraph(self.nodes, self.edges)
+        return self._graph_index
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_graph_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._graph_lock = threading.Lock()
+
+
+class DiagramDiff:
+    """
+    Node-level difference between two diagram versions, keyed by node id.
+
+    `changed` only lists nodes whose `importPath` or `parameters` differ,
+    i.e. the ones whose resolved callable has to be re-imported. Edits to
+    descriptions or prompts show up in `modified` instead.
+    """
+
+    def __init__(self, old: Optional[DiagramSnapshot], new: DiagramSnapshot):
+        self.old = old
+        self.new = new
+        old_ids = set(old.by_id) if old is not None else set()
+        new_ids = set(new.by_id)
+        self.added: List[str] = [i for i in new.by_id if i not in old_ids]
+        self.removed: List[str] = [i for i in old.by_id if i not in new_ids] if old is not None else []
+        self.changed: List[str] = []
+        self.modified: List[str] = []
+        for node_id in new.by_id:
+            if node_id not in old_ids:
+                continue
+            before, after = old.by_id[node_id], new.by_id[node_id]
+            if before == after:
+                continue
+            if (before.get('importPath') != after.get('importPath')
+                    or before.get('parameters') != after.get('parameters')):
+                self.changed.append(node_id)
+            else:
+                self.modified.append(node_id)
+
+    @property
+    def reimport(self) -> List[str]:
+        """Ids of nodes whose callables must be resolved again."""
+        return self.added + self.changed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.modified)
+
+    def __repr__(self) -> str:
+        return (f"DiagramDiff(added={self.added}, removed={self.removed}, "
+                f"changed={self.changed}, modified={self.modified})")
+
+
+class DiagramRegistry:
+    """
+    Process-wide cache of diagram.json.
+
+    The file is parsed once and re-parsed only when its mtime/size changes
+    *and* its content hash differs, so a `touch` does not cost a reparse.
+    With `compiled=True` every parsed version is also stored as a binary
+    snapshot (indexes and adjacency included), and a cold start loads that
+    snapshot instead of the JSON when the source hash still matches.
+    New versions replace the current snapshot in a single assignment, so
+    in-flight calls finish on the snapshot they started with.
+    """
+
+    def __init__(self, path: str = DEFAULT_DIAGRAM_PATH, compiled: bool = True):
+        self.path = os.path.abspath(path)
+        self.compiled = compiled
+        self._lock = threading.Lock()
+        self._snapshot: Optional[DiagramSnapshot] = None
+        self._subscribers: List[Callable[[DiagramDiff], None]] = []
+        self._invalid_stat_key: Optional[Tuple[int, int]] = None
+        # Set by DiagramWatcher: lookups then trust the watcher instead of
+        # stat()ing the file on every call
+        self.watched = False
+
+    def _stat_key(self) -> Tuple[int, int]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"The file at {self.path} was not found. ")
+        if stat.S_ISDIR(st.st_mode):
+            raise IsADirectoryError(f"The path {self.path} is a directory, not a file.")
+        return st.st_mtime_ns, st.st_size
+
+    def subscribe(self, callback: Callable[[DiagramDiff], None]) -> None:
+        """Call `callback(diff)` every time a new diagram version is loaded."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[DiagramDiff], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def snapshot(self) -> DiagramSnapshot:
+        """
+        Return the current snapshot, reloading it if the file changed.
+
+        Returns:
+            DiagramSnapshot: Parsed diagram with name/id/alias indexes
+        """
+        current = self._snapshot
+        if current is not None and self.watched:
+            return current
+        return self.refresh()
+
+    def refresh(self) -> DiagramSnapshot:
+        """
+        Check the file and swap in a new snapshot if its content changed.
+
+        A file that fails to parse (e.g. caught mid-save) keeps the previous
+        snapshot in place and is retried on the next refresh.
+
+        Returns:
+            DiagramSnapshot: The snapshot that is current after the check
+        """
+        stat_key = self._stat_key()
+        current = self._snapshot
+        if current is not None and stat_key in (current.stat_key, self._invalid_stat_key):
+            return current
+
+        with self._lock:
+            current = self._snapshot
+            if current is not None and stat_key in (current.stat_key, self._invalid_stat_key):
+                return current
+            # Cold start: an unchanged file is read and hashed, but not parsed
+            new = self._load(current, stat_key)
+            if new is current:
+                return current
+            self._snapshot = new
+
+        return self._notify(current, new)
+
+    def _load(self, current: Optional[DiagramSnapshot], stat_key: Tuple[int, int]) -> DiagramSnapshot:
+        """Read, hash and (only if needed) parse the file; called under the lock."""
+        try:
+            with open(self.path, 'rb') as file:
+                raw = file.read()
+        except Exception as e:
+            raise Exception(f"An error occurred while trying to read the file at {self.path}: {e}")
+
+        digest = hashlib.sha256(raw).hexdigest()
+        if current is not None and current.digest == digest:
+            # Touched but unchanged: keep the indexes, remember the new stat
+            current.stat_key = stat_key
+            return current
+
+        if self.compiled:
+            compiled = read_compiled(self.path, digest, stat_key)
+            if compiled is not None:
+                return compiled
+        try:
+            graph = json.loads(raw)
+        except ValueError as e:
+            if current is None:
+                raise
+            print(f"Keeping previous diagram, {self.path} is not valid JSON: {e}")
+            self._invalid_stat_key = stat_key
+            return current
+        new = DiagramSnapshot(graph, digest, stat_key)
+        if self.compiled:
+            write_compiled(self.path, new)
+        return new
+
+    def _notify(self, current: Optional[DiagramSnapshot], new: DiagramSnapshot) -> DiagramSnapshot:
+        diff = DiagramDiff(current, new)
+        for callback in list(self._subscribers):
+            try:
+                callback(diff)
+            except Exception as e:
+                print(f"Diagram reload subscriber {callback!r} failed: {e}")
+        return new
+
+    def find_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """Return the first node whose 'name' matches."""
+        return self.snapshot().by_name.get(name)
+
+    def find_by_id(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Return the node with the given 'id'."""
+        return self.snapshot().by_id.get(node_id)
+
+    def find_by_alias(self, alias: str) -> Optional[Dict[str, Any]]:
+        """Return the first node whose 'importPath.aliases' matches."""
+        return self.snapshot().by_alias.get(alias)
+
+    def resolve(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look a node up by name, then alias, then id."""
+        snap = self.snapshot()
+        return snap.by_name.get(key) or snap.by_alias.get(key) or snap.by_id.get(key)
+
+    def children_of(self, node_id: str) -> List[Dict[str, Any]]:
+        """Return the nodes directly connected below `node_id`."""
+        snap = self.snapshot()
+        return [snap.by_id[c] for c in snap.graph_index.children_of(node_id)]
+
+    def reachable_functions(self, node_id: str) -> List[Dict[str, Any]]:
+        """Return every function node reachable from `node_id`, in topological order."""
+        snap = self.snapshot()
+        index = snap.graph_index
+        reachable = sorted(index.reachable_functions(node_id), key=index.position.__getitem__)
+        return [snap.by_id[n] for n in reachable]
+
+
+_registries: Dict[str, DiagramRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(path: str = DEFAULT_DIAGRAM_PATH) -> DiagramRegistry:
+    """Return the shared registry for `path`, creating it on first use."""
+    path = os.path.abspath(path)
+    registry = _registries.get(path)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.setdefault(path, DiagramRegistry(path))
+    return registry
@@ -0,0 +1,138 @@
+# data_calls/diagram_watcher.py
+from typing import Optional
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_calls.diagram_registry import DiagramRegistry, get_registry
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal ctypes binding; raises OSError where inotify is unavailable."""
+
+    def __init__(self, directory: str):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch the directory, not the file: editors usually save by writing
+        # a temp file and renaming it over the original.
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: float) -> set:
+        """Block up to `timeout` seconds and return the changed file names."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        names = set()
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buf):
+            _, _, _, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            names.add(os.fsdecode(buf[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DiagramWatcher:
+    """
+    Background thread that keeps a DiagramRegistry in sync with its file.
+
+    Uses inotify when available and falls back to polling the file's
+    mtime every `interval` seconds. While running, registry lookups skip
+    their per-call stat() and read the current snapshot directly.
+    """
+
+    def __init__(self, registry: Optional[DiagramRegistry] = None, interval: float = 0.5,
+                 settle: float = 0.05, use_inotify: bool = True):
+        self.registry = registry or get_registry()
+        self.interval = interval
+        self.settle = settle  # let bursts of writes from one save land first
+        self.use_inotify = use_inotify
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'DiagramWatcher':
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self.registry.refresh()
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify(os.path.dirname(self.registry.path))
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}), polling {self.registry.path}")
+        self.backend = 'inotify' if inotify is not None else 'polling'
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(inotify,),
+                                        name='diagram-watcher', daemon=True)
+        self._thread.start()
+        self.registry.watched = True
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.registry.watched = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, inotify: Optional[_Inotify]):
+        filename = os.path.basename(self.registry.path)
+        try:
+            while not self._stop.is_set():
+                if inotify is not None:
+                    if filename not in inotify.wait(self.interval):
+                        continue
+                    time.sleep(self.settle)
+                    inotify.wait(0)  # drain the rest of the burst
+                else:
+                    self._stop.wait(self.interval)
+                try:
+                    self.registry.refresh()
+                except Exception as e:
+                    print(f"Diagram reload failed: {e}")
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def watch_diagram(registry: Optional[DiagramRegistry] = None, **kwargs) -> DiagramWatcher:
+    """Start (once) and return the watcher for `registry`."""
+    registry = registry or get_registry()
+    with _watchers_lock:
+        watcher = _watchers.get(registry.path)
+        if watcher is None:
+            watcher = _watchers[registry.path] = DiagramWatcher(registry, **kwargs)
+        return watcher.start()
@@ -0,0 +1,236 @@
+# data_calls/feature_cache.py
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+
+from data_calls.cache_paths import cache_dir
+
+DEFAULT_MAX_BYTES = int(os.environ.get('MMP_FEATURE_CACHE_BYTES', 2 * 1024 ** 3))
+_HASH_BLOCK = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file, read in 1 MiB blocks."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class FeatureCache:
+    """
+    Content-addressed store of processed feature matrices.
+
+    An entry is `<key>.npy` plus a `<key>.columns.json` sidecar (sparse
+    CSR entries add `<key>.indices.npy` and `<key>.indptr.npy`; split
+    compact matrices add one `<key>.<i>.npy` per further dtype block),
+    where the key covers the source file's sha256, its mtime and the encoding
+    settings. Hits are opened with `np.load(mmap_mode='r')`, so a repeat
+    load only maps the file instead of re-reading, re-parsing and
+    re-encoding the source. The store is kept under `max_bytes` by
+    evicting the least recently used entries.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root or cache_dir('features')
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def _source_digest(self, path: str, stat_key: Tuple[int, int]) -> str:
+        """Hash a source once per (mtime, size); remembered across processes."""
+        memo = self._digests.get(path)
+        if memo is not None and memo[0] == stat_key:
+            return memo[1]
+
+        sidecar = os.path.join(self.root, 'sources',
+                               hashlib.sha1(path.encode('utf-8')).hexdigest() + '.json')
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if tuple(stored['stat']) == stat_key:
+                self._digests[path] = (stat_key, stored['digest'])
+                return stored['digest']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        digest = file_digest(path)
+        self._digests[path] = (stat_key, digest)
+        try:
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            self._write_atomic(sidecar, json.dumps({'path': path, 'stat': stat_key, 'digest': digest}).encode('utf-8'))
+        except OSError:
+            pass
+        return digest
+
+    def source_digest(self, path: Union[str, Sequence[str]]) -> str:
+        """sha256 identity of a source file, or of all partition files of one source."""
+        digests = []
+        for p in ([path] if isinstance(path, str) else path):
+            p = os.path.abspath(p)
+            st = os.stat(p)
+            digests.append(self._source_digest(p, (st.st_mtime_ns, st.st_size)))
+        if isinstance(path, str):
+            return digests[0]
+        return hashlib.sha256('\n'.join(digests).encode('utf-8')).hexdigest()
+
+    def key(self, path: Union[str, Sequence[str]], settings: Dict[str, Any]) -> str:
+        """
+        Cache key for `path` encoded with `settings`.
+
+        Args:
+            path: Source file, or the partition files of one source
+            settings: Everything that changes the encoded output
+
+        Returns:
+            str: Hex key naming the entry
+        """
+        sources = []
+        for p in ([path] if isinstance(path, str) else path):
+            p = os.path.abspath(p)
+            st = os.stat(p)
+            stat_key = (st.st_mtime_ns, st.st_size)
+            sources.append({'digest': self._source_digest(p, stat_key), 'mtime_ns': st.st_mtime_ns})
+        if isinstance(path, str):
+            sources = sources[0]  # keys of single files stay what they were
+        payload = json.dumps({
+            **(sources if isinstance(sources, dict) else {'partitions': sources}),
+            'settings': settings,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        return os.path.join(self.root, f"{key}.npy"), os.path.join(self.root, f"{key}.columns.json")
+
+    def _csr_paths(self, key: str) -> Tuple[str, str]:
+        return os.path.join(self.root, f"{key}.indices.npy"), os.path.join(self.root, f"{key}.indptr.npy")
+
+    def _block_path(self, key: str, i: int) -> str:
+        return os.path.join(self.root, f"{key}.{i}.npy")
+
+    def get(self, key: str) -> Optional[Tuple[Any, List[str]]]:
+        """Return (memory-mapped matrix, columns) or None on a miss."""
+        data_path, columns_path = self._paths(key)
+        try:
+            with open(columns_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            data = np.load(data_path, mmap_mode='r')
+            if isinstance(meta, dict) and meta.get('format') == 'csr':
+                # CSR entry: the three arrays are mapped, not copied
+                import scipy.sparse as sp
+                indices_path, indptr_path = self._csr_paths(key)
+                data = sp.csr_matrix(
+                    (data, np.load(indices_path, mmap_mode='r'), np.load(indptr_path, mmap_mode='r')),
+                    shape=tuple(meta['shape']), copy=False,
+                )
+                columns = meta['columns']
+            elif isinstance(meta, dict):
+                # Split matrix: a DataFrame over its mapped dtype blocks
+                from data_calls.feature_layout import block_frame
+                blocks = [data] + [np.load(self._block_path(key, i), mmap_mode='r')
+                                   for i in range(1, meta['blocks'])]
+                columns = meta['columns']
+                data = block_frame(blocks, columns)
+            else:
+                columns = meta
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(data_path)  # recency for LRU eviction
+        except OSError:
+            pass
+        return data, columns
+
+    def put(self, key: str, data: Any, columns: List[str]) -> None:
+        """Store an entry, then evict old ones until the store fits."""
+        data_path, columns_path = self._paths(key)
+        meta: Any = list(columns)
+        try:
+            if hasattr(data, 'tocsr'):
+                csr = data.tocsr()
+                indices_path, indptr_path = self._csr_paths(key)
+                self._save_atomic(indices_path, csr.indices)
+                self._save_atomic(indptr_path, csr.indptr)
+                data = csr.data
+                meta = {'format': 'csr', 'shape': list(csr.shape), 'columns': list(columns)}
+            elif hasattr(data, 'columns'):
+                from data_calls.feature_layout import frame_blocks
+                blocks = frame_blocks(data)
+                for i, block in enumerate(blocks[1:], start=1):
+                    self._save_atomic(self._block_path(key, i), block)
+                data = blocks[0]
+                meta = {'format': 'blocks', 'blocks': len(blocks), 'columns': list(columns)}
+            self._write_atomic(columns_path, json.dumps(meta).encode('utf-8'))
+            # Written last: an entry is only served once its .npy exists
+            self._save_atomic(data_path, data)
+        except (OSError, ValueError):
+            return
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used entries beyond `max_bytes`; returns bytes freed."""
+        with self._lock:
+            sizes: Dict[str, int] = {}
+            used: Dict[str, float] = {}
+            files: Dict[str, List[str]] = {}
+            for name in os.listdir(self.root):
+                if not name.endswith('.npy'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.root, name))
+                except OSError:
+                    continue
+                key, _, suffix = name.partition('.')
+                sizes[key] = sizes.get(key, 0) + st.st_size
+                files.setdefault(key, []).append(os.path.join(self.root, name))
+                if suffix == 'npy':
+                    used[key] = st.st_mtime
+
+            total = sum(sizes.values())
+            freed = 0
+            for key in sorted(sizes, key=lambda k: used.get(k, 0.0)):
+                size = sizes[key]
+                if total <= self.max_bytes:
+                    break
+                for p in self._paths(key) + tuple(files[key]):
+                    try:
+                        os.unlink(p)
+                    except OSError:
+                        pass
+                total -= size
+                freed += size
+            return freed
+
+    def _save_atomic(self, path: str, array: np.ndarray) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npy.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+            os.replace(tmp, path)
+        except (OSError, ValueError):
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _write_atomic(self, path: str, payload: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+
+
+_default_cache: Optional[FeatureCache] = None
+
+
+def get_feature_cache() -> FeatureCache:
+    """Return the process-wide cache under MMP_CACHE_DIR/features."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FeatureCache()
+    return _default_cache
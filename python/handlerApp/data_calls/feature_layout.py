@@ -0,0 +1,598 @@
+# data_calls/feature_layout.py
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+
+# What DataLoader._process_dataframe has always selected
+NUMERIC_DTYPES = (np.dtype('int64'), np.dtype('float64'))
+
+DEFAULT_CHUNKSIZE = 100_000
+
+LAYOUT_FORMAT = 1
+
+
+class LayoutMismatch(ValueError):
+    """A batch holds values the matrix dtype picked from a stored layout cannot hold exactly."""
+
+
+def _kind(dtype) -> str:
+    if dtype in NUMERIC_DTYPES:
+        return 'numeric'
+    # pandas >= 3 reads text as StringDtype rather than object
+    if dtype == object or isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)):
+        return 'categorical'
+    return 'other'  # bool, datetime, ...: dropped, as before
+
+
+class FeatureLayout:
+    """
+    Column layout of a delimited file, learned one batch at a time.
+
+    Pass one (`update`) sees every batch once and records which columns
+    are numeric, which are categorical and every category they contain.
+    Pass two (`encode_into`) writes each batch straight into a
+    preallocated matrix, so the file never has to be held in memory as
+    text or as a full DataFrame. The result matches what
+    `_process_dataframe` produces for the whole file at once: numeric
+    columns first, then one-hot blocks with sorted categories.
+    """
+
+    def __init__(self, track_ranges: bool = False):
+        self.columns: List[str] = []
+        self.kinds: Dict[str, str] = {}
+        self.numeric_dtypes: Dict[str, np.dtype] = {}
+        self.categories: Dict[str, set] = {}
+        self.has_nan: Dict[str, bool] = {}
+        self.n_rows = 0
+        # Columns whose inferred type differed between batches; the file has
+        # to be re-read with these forced to object, as a whole-file read would
+        self.retyped: List[str] = []
+        self._sorted: Optional[Dict[str, List[Any]]] = None
+        # Value ranges for the compact dtype mode; only collected on request
+        # since they cost an extra look at every numeric chunk
+        self.track_ranges = track_ranges
+        self.int_ranges: Dict[str, Tuple[int, int]] = {}
+        self.float32_exact: Dict[str, bool] = {}
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold one batch into the layout (pass one)."""
+        self._sorted = None
+        for col in df.columns:
+            series = df[col]
+            kind = _kind(series.dtype)
+            prev = self.kinds.get(col)
+            if prev is None:
+                self.columns.append(col)
+                self.kinds[col] = kind
+            elif prev != kind:
+                if col not in self.retyped:
+                    self.retyped.append(col)
+                continue
+
+            if kind == 'numeric':
+                prev_dtype = self.numeric_dtypes.get(col, series.dtype)
+                self.numeric_dtypes[col] = np.result_type(prev_dtype, series.dtype)
+                if self.track_ranges:
+                    self._track_range(col, series)
+            elif kind == 'categorical':
+                self.categories.setdefault(col, set()).update(series.dropna().unique().tolist())
+                self.has_nan[col] = self.has_nan.get(col, False) or bool(series.isna().any())
+        self.n_rows += len(df)
+
+    def merge(self, other: 'FeatureLayout') -> None:
+        """
+        Fold in a layout fitted on another partition of the same data.
+
+        The result is the layout of the partitions concatenated in merge
+        order: columns in order of first appearance and one shared category
+        vocabulary. A column missing from a partition is NaN in its rows,
+        and a column whose kind differs between partitions lands in `retyped`.
+        """
+        self._sorted = None
+        # Columns that will be NaN in the rows of the partition lacking them
+        missing = [c for c in self.columns if other.n_rows and c not in other.kinds]
+        missing += [c for c in other.columns if self.n_rows and c not in self.kinds]
+
+        for col in other.columns:
+            kind = other.kinds[col]
+            prev = self.kinds.get(col)
+            if prev is None:
+                self.columns.append(col)
+                self.kinds[col] = kind
+            elif prev != kind:
+                if col not in self.retyped:
+                    self.retyped.append(col)
+                continue
+            if kind == 'numeric':
+                dtype = other.numeric_dtypes[col]
+                self.numeric_dtypes[col] = np.result_type(self.numeric_dtypes.get(col, dtype), dtype)
+                if col in other.int_ranges:
+                    lo, hi = other.int_ranges[col]
+                    prev_range = self.int_ranges.get(col)
+                    self.int_ranges[col] = (lo, hi) if prev_range is None else (min(prev_range[0], lo), max(prev_range[1], hi))
+                if col in other.float32_exact:
+                    self.float32_exact[col] = self.float32_exact.get(col, True) and other.float32_exact[col]
+            elif kind == 'categorical':
+                self.categories.setdefault(col, set()).update(other.categories.get(col, ()))
+                self.has_nan[col] = self.has_nan.get(col, False) or other.has_nan.get(col, False)
+        for col in other.retyped:
+            if col not in self.retyped:
+                self.retyped.append(col)
+        for col in missing:
+            if self.kinds[col] == 'numeric':
+                self.numeric_dtypes[col] = np.result_type(self.numeric_dtypes[col], np.float64)
+            elif self.kinds[col] == 'categorical':
+                self.has_nan[col] = True
+        self.n_rows += other.n_rows
+
+    def _track_range(self, col: str, series: pd.Series) -> None:
+        values = series.to_numpy()
+        if values.dtype.kind == 'i':
+            if len(values):
+                lo, hi = int(values.min()), int(values.max())
+                prev = self.int_ranges.get(col)
+                self.int_ranges[col] = (lo, hi) if prev is None else (min(prev[0], lo), max(prev[1], hi))
+        else:
+            exact = np.array_equal(values.astype(np.float32).astype(values.dtype), values, equal_nan=True)
+            self.float32_exact[col] = self.float32_exact.get(col, True) and bool(exact)
+
+    def column_dtype(self, col: str) -> np.dtype:
+        """Smallest dtype that holds every value seen in numeric column `col`."""
+        if not self.track_ranges:
+            return self.numeric_dtypes[col]
+        lo, hi = self.int_ranges.get(col, (0, 0))
+        if self.numeric_dtypes[col].kind == 'i':
+            candidates = ('uint8', 'uint16', 'uint32') if lo >= 0 else ('int8', 'int16', 'int32')
+            for name in candidates:
+                info = np.iinfo(name)
+                if info.min <= lo and hi <= info.max:
+                    return np.dtype(name)
+            return np.dtype('int64')
+        # Integers seen in earlier chunks must survive float32 as well
+        if self.float32_exact.get(col, True) and -2 ** 24 <= lo and hi <= 2 ** 24:
+            return np.dtype('float32')
+        return np.dtype('float64')
+
+    def matrix_dtype(self, compact: bool = False, dtype: Any = None) -> Any:
+        """
+        dtype of the feature matrix.
+
+        Args:
+            compact: Smallest dtype every column fits in without loss (needs
+                track_ranges). One float64 column would otherwise widen the
+                one-hot columns too, so when the numeric columns need more
+                than uint8 the matrix is split: (numeric dtype, uint8), the
+                one-hot block kept apart (see encode_chunks)
+            dtype: Force this dtype instead, e.g. 'float32'
+
+        Returns:
+            np.dtype, or a (numeric, one-hot) tuple for a split matrix
+        """
+        if dtype is not None:
+            return np.dtype(dtype)
+        if not compact:
+            return self.dtype
+        dtypes = [self.column_dtype(c) for c in self.numeric_columns]
+        if not self.categorical_columns:
+            return np.result_type(*dtypes) if dtypes else np.dtype('float64')
+        onehot = np.dtype('uint8')
+        numeric = np.result_type(*dtypes) if dtypes else onehot
+        return onehot if np.result_type(numeric, onehot) == onehot else (numeric, onehot)
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return [c for c in self.columns if self.kinds[c] == 'numeric']
+
+    @property
+    def categorical_columns(self) -> List[str]:
+        return [c for c in self.columns if self.kinds[c] == 'categorical']
+
+    def sorted_categories(self, col: str) -> List[Any]:
+        """Categories of `col` in OneHotEncoder order (NaN excluded)."""
+        if self._sorted is None:
+            self._sorted = {c: sorted(self.categories.get(c, ())) for c in self.categorical_columns}
+        return self._sorted[col]
+
+    def block_width(self, col: str) -> int:
+        return len(self.sorted_categories(col)) + (1 if self.has_nan.get(col) else 0)
+
+    @property
+    def default_label(self) -> Optional[str]:
+        """The file's last column when it is numeric, and so a matrix column of its own; else None."""
+        if self.columns and self.kinds[self.columns[-1]] == 'numeric':
+            return self.columns[-1]
+        return None
+
+    @property
+    def feature_names(self) -> List[str]:
+        names = list(self.numeric_columns)
+        for col in self.categorical_columns:
+            names.extend(f"{col}_{cat}" for cat in self.sorted_categories(col))
+            if self.has_nan.get(col):
+                names.append(f"{col}_nan")
+        return names
+
+    @property
+    def dtype(self) -> np.dtype:
+        if self.categorical_columns:
+            return np.dtype('float64')
+        dtypes = [self.numeric_dtypes[c] for c in self.numeric_columns]
+        return np.result_type(*dtypes) if dtypes else np.dtype('float64')
+
+    @property
+    def read_dtypes(self) -> Dict[str, Any]:
+        """dtype overrides that make a new file parse the way this layout expects."""
+        # Categories are matched as strings, even where new data looks numeric
+        return {col: object for col in self.categorical_columns}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable fitted state; row count excluded."""
+        return {
+            'format': LAYOUT_FORMAT,
+            'columns': list(self.columns),
+            'kinds': dict(self.kinds),
+            'numeric_dtypes': {c: str(d) for c, d in self.numeric_dtypes.items()},
+            'categories': {c: self.sorted_categories(c) for c in self.categorical_columns},
+            'has_nan': {c: bool(v) for c, v in self.has_nan.items()},
+            'track_ranges': self.track_ranges,
+            'int_ranges': {c: list(r) for c, r in self.int_ranges.items()},
+            'float32_exact': dict(self.float32_exact),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'FeatureLayout':
+        """Inverse of to_dict; raises ValueError for another format."""
+        if state.get('format') != LAYOUT_FORMAT:
+            raise ValueError(f"Unsupported layout format: {state.get('format')}")
+        layout = cls(state['track_ranges'])
+        layout.columns = list(state['columns'])
+        layout.kinds = dict(state['kinds'])
+        layout.numeric_dtypes = {c: np.dtype(d) for c, d in state['numeric_dtypes'].items()}
+        layout.categories = {c: set(cats) for c, cats in state['categories'].items()}
+        layout.has_nan = dict(state['has_nan'])
+        layout.int_ranges = {c: tuple(r) for c, r in state['int_ranges'].items()}
+        layout.float32_exact = dict(state['float32_exact'])
+        return layout
+
+    @property
+    def fingerprint(self) -> str:
+        """sha256 of the fitted state: equal fingerprints give identical columns."""
+        payload = json.dumps(self.to_dict(), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def allocate(self, dtype: Any = None, n_rows: Optional[int] = None) -> Any:
+        """
+        Empty output matrix for every row seen by `update`, or for `n_rows`.
+
+        A (numeric, one-hot) dtype from matrix_dtype allocates the two
+        blocks of a split matrix instead, as a tuple.
+        """
+        width = len(self.feature_names)
+        if width == 0:
+            return np.array([]).reshape(-1, 1)
+        n_rows = self.n_rows if n_rows is None else n_rows
+        if isinstance(dtype, tuple):
+            k = len(self.numeric_columns)
+            return np.empty((n_rows, k), dtype=dtype[0]), np.empty((n_rows, width - k), dtype=dtype[1])
+        return np.empty((n_rows, width), dtype=dtype or self.dtype)
+
+    def _numeric_values(self, df: pd.DataFrame, dtype: np.dtype, exact: bool) -> np.ndarray:
+        numeric = self.numeric_columns
+        if all(c in df.columns for c in numeric) and all(df[c].dtype in NUMERIC_DTYPES for c in numeric):
+            frame = df[numeric]
+        else:
+            # New data against a stored layout: missing columns become NaN,
+            # text in a numeric column is coerced
+            frame = pd.DataFrame({c: pd.to_numeric(df[c], errors='coerce') if c in df.columns
+                                  else np.full(len(df), np.nan) for c in numeric}, index=df.index)
+        source = np.result_type(*frame.dtypes)
+        if not exact or np.can_cast(source, dtype, 'safe'):
+            return frame.to_numpy(dtype=dtype)
+
+        values = frame.to_numpy()
+        with np.errstate(invalid='ignore', over='ignore'):
+            cast = values.astype(dtype)
+            same = np.array_equal(cast.astype(values.dtype), values, equal_nan=True)
+        if not same:
+            raise LayoutMismatch(f"Values in {numeric} do not fit {dtype}")
+        return cast
+
+    def encode_into(self, df: pd.DataFrame, out: np.ndarray, row: int, exact: bool = False) -> int:
+        """
+        Write one batch into `out[row:row + len(df)]` (pass two).
+
+        Categories not seen during pass one encode as all zeros, like
+        OneHotEncoder(handle_unknown='ignore'). Columns the layout does not
+        know are ignored.
+
+        Args:
+            df: Batch to encode
+            out: Matrix from `allocate`, or the (numeric, one-hot) blocks
+                of a split matrix
+            row: First row of `out` to write
+            exact: Raise LayoutMismatch instead of rounding or wrapping
+                numeric values that do not fit out.dtype
+
+        Returns:
+            int: The row where the next batch starts
+        """
+        end = row + len(df)
+        numeric = self.numeric_columns
+        if isinstance(out, tuple):
+            values, onehot, offset = out[0], out[1], 0
+        else:
+            values, onehot, offset = out, out, len(numeric)
+        if numeric:
+            values[row:end, :len(numeric)] = self._numeric_values(df, values.dtype, exact)
+
+        for col in self.categorical_columns:
+            cats = self.sorted_categories(col)
+            width = self.block_width(col)
+            block = onehot[row:end, offset:offset + width]
+            block[...] = 0
+            series = self._categorical(df, col)
+            codes = pd.Categorical(series, categories=cats).codes
+            hit = np.flatnonzero(codes >= 0)
+            block[hit, codes[hit]] = 1
+            if self.has_nan.get(col):
+                block[series.isna().to_numpy(), width - 1] = 1
+            offset += width
+        return end
+
+    @staticmethod
+    def _categorical(df: pd.DataFrame, col: str) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series(np.nan, index=df.index, dtype=object)
+        series = df[col]
+        if _kind(series.dtype) != 'categorical':
+            # Parsed as numbers this time; categories were fitted as text
+            series = series.astype(str).where(series.notna())
+        return series
+
+    def encode_sparse(self, df: pd.DataFrame, dtype: Any = None,
+                      exact: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Encode one batch as CSR pieces: (data, column indices, nnz per row).
+
+        Every row holds its numeric values followed by at most one entry per
+        categorical column, already in column order, so batches can simply
+        be concatenated into one CSR matrix.
+        """
+        numeric = self.numeric_columns
+        categorical = self.categorical_columns
+        n = len(df)
+        width = len(numeric) + len(categorical)
+        dtype = np.dtype(dtype or self.dtype)
+        values = np.zeros((n, width), dtype=dtype)
+        cols = np.full((n, width), -1, dtype=np.int64)
+
+        if numeric:
+            values[:, :len(numeric)] = self._numeric_values(df, dtype, exact)
+            cols[:, :len(numeric)] = np.arange(len(numeric))
+
+        offset = len(numeric)
+        for j, col in enumerate(categorical, start=len(numeric)):
+            cats = self.sorted_categories(col)
+            series = self._categorical(df, col)
+            codes = pd.Categorical(series, categories=cats).codes.astype(np.int64)
+            if self.has_nan.get(col):
+                codes[series.isna().to_numpy()] = len(cats)
+            hit = codes >= 0
+            cols[hit, j] = offset + codes[hit]
+            values[hit, j] = 1
+            offset += self.block_width(col)
+
+        keep = (cols >= 0) & (values != 0)
+        return values[keep], cols[keep], keep.sum(axis=1)
+
+
+def iter_csv_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                    dtype: Optional[Dict[str, Any]] = None) -> Iterator[pd.DataFrame]:
+    """Yield `path` as DataFrames of at most `chunksize` rows."""
+    with pd.read_csv(path, chunksize=chunksize, dtype=dtype or None) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def fit_csv_layout(path: str, chunksize: int = DEFAULT_CHUNKSIZE, track_ranges: bool = False,
+                   overrides: Optional[Dict[str, Any]] = None) -> Tuple[FeatureLayout, Dict[str, Any]]:
+    """
+    Learn the layout of a CSV in one streaming pass.
+
+    Args:
+        path: CSV file
+        chunksize: Rows per chunk
+        track_ranges: Record value ranges for the compact dtype mode
+        overrides: dtypes to force from the start, e.g. {col: object}
+
+    Returns:
+        tuple: (FeatureLayout, dtype overrides to pass to every later read)
+    """
+    overrides = dict(overrides or {})
+    while True:
+        layout = FeatureLayout(track_ranges)
+        for chunk in iter_csv_chunks(path, chunksize, overrides):
+            layout.update(chunk)
+        if not layout.retyped:
+            return layout, overrides
+        overrides.update({col: object for col in layout.retyped})
+
+
+def encode_csv(path: str, chunksize: int = DEFAULT_CHUNKSIZE, sparse: bool = False,
+               compact: bool = False, dtype: Any = None) -> Tuple[Any, List[str]]:
+    """
+    Stream a CSV into its processed feature matrix.
+
+    Peak memory is the final matrix plus one chunk.
+
+    Args:
+        path: CSV file
+        chunksize: Rows per chunk
+        sparse: Return a scipy.sparse CSR matrix instead of a dense array
+        compact: Use the smallest lossless dtype (see FeatureLayout.matrix_dtype)
+        dtype: Force the matrix dtype, e.g. 'float32'
+
+    Returns:
+        tuple: (processed matrix, list of column names)
+    """
+    layout, _ = fit_csv_layout(path, chunksize, track_ranges=compact and dtype is None)
+    matrix = transform_csv(path, layout, chunksize, sparse, layout.matrix_dtype(compact, dtype),
+                           n_rows=layout.n_rows, exact=False)
+    return matrix, layout.feature_names
+
+
+def transform_csv(path: str, layout: FeatureLayout, chunksize: int = DEFAULT_CHUNKSIZE,
+                  sparse: bool = False, dtype: Any = None, n_rows: Optional[int] = None,
+                  exact: bool = True, out: Any = None) -> Any:
+    """
+    Encode a CSV against an already fitted layout, without refitting.
+
+    Args:
+        path: CSV file
+        layout: Fitted layout, e.g. from FeatureLayout.from_dict
+        chunksize: Rows per chunk
+        sparse: Return a scipy.sparse CSR matrix instead of a dense array
+        dtype: Matrix dtype (defaults to layout.dtype); see encode_chunks
+        n_rows: Rows in the file, when already known
+        exact: See FeatureLayout.encode_into
+        out: Dense matrix (or split blocks) to write into instead of allocating one
+
+    Returns:
+        The processed matrix, with columns layout.feature_names
+    """
+    if out is not None:
+        n_rows = len(out[0] if isinstance(out, tuple) else out)
+    if n_rows is None and not sparse:
+        from data_calls.file_info import count_csv_rows
+        n_rows = count_csv_rows(path)
+    chunks = lambda: iter_csv_chunks(path, chunksize, layout.read_dtypes)
+    return encode_chunks(layout, chunks, sparse, dtype, n_rows, exact, out)
+
+
+def encode_chunks(layout: FeatureLayout, chunks: Callable[[], Iterable[pd.DataFrame]],
+                  sparse: bool = False, dtype: Any = None, n_rows: Optional[int] = None,
+                  exact: bool = False, out: Any = None) -> Any:
+    """
+    Second pass shared by every streaming source.
+
+    Args:
+        layout: Fitted layout
+        chunks: Returns a fresh iterator over the source's DataFrames
+        sparse: Build a scipy.sparse CSR matrix instead of a dense array
+        dtype: Matrix dtype (defaults to layout.dtype), or the (numeric,
+            one-hot) pair of a split matrix from FeatureLayout.matrix_dtype
+        n_rows: Rows the chunks add up to (defaults to layout.n_rows)
+        exact: See FeatureLayout.encode_into
+        out: Dense matrix to write into instead of allocating one, e.g. a
+            slice of a larger memory-mapped matrix; the (numeric, one-hot)
+            blocks for a split matrix
+
+    Returns:
+        The processed matrix. A split matrix is returned as a DataFrame
+        over its two blocks (see block_frame)
+    """
+    split = isinstance(dtype, tuple)
+    dtype = tuple(np.dtype(d) for d in dtype) if split else np.dtype(dtype or layout.dtype)
+    if sparse:
+        # Only the non-zeros are stored: one dtype for both blocks
+        return _encode_sparse(layout, chunks, np.result_type(*dtype) if split else dtype, exact)
+
+    if out is not None:
+        blocks = out if isinstance(out, tuple) else (out,)
+        if any(block.size for block in blocks):
+            row = 0
+            for chunk in chunks():
+                row = layout.encode_into(chunk, out, row, exact)
+            if row != blocks[0].shape[0]:
+                raise ValueError(f"Expected {blocks[0].shape[0]} rows, read {row}; did the source change?")
+        return block_frame(out, layout.feature_names) if isinstance(out, tuple) else out
+
+    # n_rows is a pre-count and can disagree with the parse; the parse wins
+    out = layout.allocate(dtype, n_rows)
+    blocks = out if split else (out,)
+    if blocks[-1].shape[1] and len(layout.feature_names):
+        row = 0
+        for chunk in chunks():
+            if row + len(chunk) > blocks[0].shape[0]:
+                grown = layout.allocate(dtype, max(2 * blocks[0].shape[0], row + len(chunk)))
+                for new, old in zip(grown if split else (grown,), blocks):
+                    new[:row] = old[:row]
+                out = grown
+                blocks = out if split else (out,)
+            row = layout.encode_into(chunk, out, row, exact)
+        if row != blocks[0].shape[0]:
+            blocks = tuple(block[:row] for block in blocks)
+            out = blocks if split else blocks[0]
+    return block_frame(out, layout.feature_names) if split else out
+
+
+def block_frame(blocks: Sequence[np.ndarray], columns: List[str]) -> pd.DataFrame:
+    """
+    DataFrame over column blocks of different dtypes, e.g. a split matrix.
+
+    Each block stays one pandas block of its own dtype and is not copied,
+    so a memory-mapped block stays mapped.
+    """
+    frames, start = [], 0
+    for block in blocks:
+        frames.append(pd.DataFrame(block, columns=columns[start:start + block.shape[1]], copy=False))
+        start += block.shape[1]
+    return pd.concat(frames, axis=1)
+
+
+def frame_blocks(frame: pd.DataFrame) -> List[np.ndarray]:
+    """Inverse of block_frame: the frame's runs of same-dtype columns as arrays."""
+    dtypes = list(frame.dtypes)
+    blocks, start = [], 0
+    for end in range(1, len(dtypes) + 1):
+        if end == len(dtypes) or dtypes[end] != dtypes[start]:
+            blocks.append(frame.iloc[:, start:end].to_numpy())
+            start = end
+    return blocks
+
+
+def _encode_sparse(layout: FeatureLayout, chunks: Callable[[], Iterable[pd.DataFrame]],
+                   dtype: np.dtype, exact: bool):
+    import scipy.sparse as sp
+
+    data, indices, row_nnz = [], [], []
+    for chunk in chunks():
+        d, i, nnz = layout.encode_sparse(chunk, dtype, exact)
+        data.append(d)
+        indices.append(i)
+        row_nnz.append(nnz)
+
+    row_nnz = np.concatenate(row_nnz) if row_nnz else np.array([], dtype=np.int64)
+    indptr = np.zeros(len(row_nnz) + 1, dtype=np.int64)
+    np.cumsum(row_nnz, out=indptr[1:])
+    return sp.csr_matrix(
+        (np.concatenate(data) if data else np.array([], dtype=dtype),
+         np.concatenate(indices) if indices else np.array([], dtype=np.int64),
+         indptr),
+        shape=(len(row_nnz), len(layout.feature_names)),
+    )
+
+
+def matrix_nbytes(matrix: Any) -> int:
+    """Memory held by a dense array, a CSR matrix or a split matrix's DataFrame."""
+    if hasattr(matrix, 'indptr'):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    if hasattr(matrix, 'memory_usage'):
+        return int(matrix.memory_usage(index=False).sum())
+    return matrix.nbytes
+
+
+def matrix_dtype_name(matrix: Any) -> str:
+    """dtype of a matrix as text; a split matrix lists its blocks, e.g. 'float64+uint8'."""
+    if hasattr(matrix, 'dtypes'):
+        return '+'.join(dict.fromkeys(str(d) for d in matrix.dtypes))
+    return str(matrix.dtype)
+
+
+def default_nbytes(matrix: Any) -> int:
+    """What `matrix` would take with the default float64 values."""
+    if hasattr(matrix, 'indptr'):
+        return matrix.nnz * 8 + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.size * 8
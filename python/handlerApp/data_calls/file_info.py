@@ -0,0 +1,240 @@
+# data_calls/file_info.py
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+from data_calls.cache_paths import cache_dir
+from data_calls.columnar import detect_format
+from data_calls.pdf_pages import PdfDocument, is_pdf
+
+DEFAULT_SAMPLE_ROWS = 1000
+_SCAN_BLOCK = 4 * 1024 * 1024
+_WHITESPACE_LINE = re.compile(rb'(?:^|\n)[ \t]+\r?(?:\n|$)')
+_LONE_CR = re.compile(rb'\r(?!\n)')
+# Bytes a quote may follow when it opens a field, or precede when it closes one
+_FIELD_EDGES = np.zeros(256, dtype=bool)
+_FIELD_EDGES[list(b',\n\r"')] = True
+
+_memo: Dict[Tuple[str, int], Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def count_csv_rows(path: str) -> int:
+    """
+    Data rows in a CSV, as len(pd.read_csv(path)) would report them.
+
+    Newlines are counted over the raw bytes in 4 MiB blocks, skipping those
+    inside quoted fields: the parity of the quotes seen so far, carried from
+    block to block, tells whether a byte is quoted (a doubled quote flips it
+    twice). Blank lines are discounted, as read_csv skips them. Files the
+    byte count could get wrong are counted with a chunked one-column parse
+    instead: a quote that does not open or close a field (read_csv takes it
+    literally), a quote left open at the end, whitespace-only lines (which
+    read_csv skips) and a lone '\r' (which read_csv splits lines on).
+    """
+    lines = blank = 0
+    # The two bytes before the current block; the file starts at a line start
+    tail = np.array([0, 10], dtype=np.uint8)
+    last = 10
+    quoted = 0  # parity of the quotes before the current block
+    closing = False  # the previous block ended on a closing quote
+    parse = False
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_SCAN_BLOCK), b''):
+            data = np.frombuffer(block, dtype=np.uint8)
+            arr = np.concatenate([tail, data])
+            newlines = np.flatnonzero(data == 10)
+            # Matches at block edges can be false alarms, which only cost a parse
+            # (the regexes only run on blocks with a candidate: they are slow)
+            starts = data[newlines[newlines < len(data) - 1] + 1]
+            spaced = block[:1] in (b' ', b'\t') or bool(((starts == 32) | (starts == 9)).any())
+            if (spaced and _WHITESPACE_LINE.search(block)) or (b'\r' in block and _LONE_CR.search(block)):
+                parse = True
+                break
+            if b'"' in block:
+                quotes = np.flatnonzero(data == 34)
+                # Quote k of the block opens a field when the quotes before it pair up
+                opening, closes = quotes[quoted::2], quotes[1 - quoted::2]
+                ends_block = closes + 1 == len(data)
+                # Opening quotes must start a field; closing ones end it or double
+                if (not _FIELD_EDGES[arr[opening + 1]].all()
+                        or not _FIELD_EDGES[data[closes[~ends_block] + 1]].all()
+                        or (closing and not _FIELD_EDGES[data[0]])):
+                    parse = True
+                    break
+                closing = bool(ends_block.any())
+                # Only newlines with an even number of quotes before them end a row
+                newlines = newlines[((quoted + np.searchsorted(quotes, newlines)) & 1) == 0]
+                quoted = (quoted + len(quotes)) & 1
+            elif quoted:
+                newlines = newlines[:0]  # the whole block is inside one quoted field
+            elif closing:
+                if not _FIELD_EDGES[data[0]]:
+                    parse = True
+                    break
+                closing = False
+            lines += len(newlines)
+            # A blank line is a '\n' (or '\r\n') right after another '\n'
+            blank += int(np.count_nonzero(arr[newlines + 1] == 10))
+            if b'\r' in block or tail[1] == 13:
+                blank += int(np.count_nonzero((arr[newlines + 1] == 13) & (arr[newlines] == 10)))
+            tail = arr[-2:].copy()
+            last = block[-1]
+
+    if parse or quoted:
+        rows = 0
+        with pd.read_csv(path, usecols=[0], chunksize=1_000_000) as reader:
+            for chunk in reader:
+                rows += len(chunk)
+        return rows
+
+    if last != 10:
+        lines += 1  # last line has no terminator
+    return max(lines - blank - 1, 0)  # minus the header
+
+
+def _columnar_info(path: str, fmt: str) -> Dict[str, Any]:
+    import pyarrow as pa
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        metadata = pq.ParquetFile(path, memory_map=True).metadata
+        rows, schema = metadata.num_rows, metadata.schema.to_arrow_schema()
+    else:
+        # Only the IPC footer and record batch headers are touched
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            schema = reader.schema
+            rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    dtypes = schema.empty_table().to_pandas().dtypes
+    return {
+        "type": fmt,
+        "rows": rows,
+        "columns": len(schema.names),
+        "column_types": {col: str(dtype) for col, dtype in dtypes.items()},
+    }
+
+
+def _delimited_info(path: str, sample_rows: int) -> Dict[str, Any]:
+    try:
+        sample = pd.read_csv(path, nrows=sample_rows)
+    except Exception:
+        length = 0
+        with open(path, 'r', encoding='utf-8') as file:
+            first_line = file.readline()
+            length += len(first_line)
+            for block in iter(lambda: file.read(_SCAN_BLOCK), ''):
+                length += len(block)
+        return {"type": "text", "length": length, "first_line": first_line.rstrip('\n')}
+
+    rows = len(sample) if len(sample) < sample_rows else count_csv_rows(path)
+    return {
+        "type": "csv",
+        "rows": rows,
+        "columns": len(sample.columns),
+        "column_types": {col: str(dtype) for col, dtype in sample.dtypes.items()},
+    }
+
+
+def looks_delimited(path: str, n_lines: int = 5) -> bool:
+    """
+    Whether a file node should be parsed as a table rather than read as text.
+
+    The same test DataLoader._process_content applies to the whole content,
+    run on the first `n_lines` non-blank lines only.
+
+    Args:
+        path: Path of the file to sniff
+        n_lines: Number of leading lines to check for a delimiter
+
+    Returns:
+        bool: False when the file should be treated as plain text
+    """
+    lines = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not lines and not line.strip():
+                continue  # leading blank lines are stripped by _process_content
+            lines.append(line)
+            if len(lines) > n_lines:
+                break
+    # Trailing blank lines would be stripped too
+    while lines and not lines[-1].strip():
+        lines.pop()
+    if len(lines) <= 1:
+        return True
+    potential_delimiters = [',', ';', '\t', '|']
+    return any(
+        any(delim in line for delim in potential_delimiters)
+        for line in lines[:n_lines]
+    )
+
+
+def _sidecar(path: str, sample_rows: int) -> str:
+    name = hashlib.sha1(f"{path}|{sample_rows}".encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir('info'), f"{name}.json")
+
+
+def describe_file(path: str, sample_rows: int = DEFAULT_SAMPLE_ROWS) -> Dict[str, Any]:
+    """
+    Row count, column count and dtypes of a file without parsing all of it.
+
+    Dtypes are inferred from the first `sample_rows` rows. Rows are counted
+    with a newline scan over the raw bytes, or read from the footer of
+    Parquet/Feather/Arrow files. Results are cached in memory and on disk
+    per (mtime, size) of the file, so repeat queries cost one stat().
+
+    Args:
+        path: File to describe
+        sample_rows: Rows read to infer dtypes
+
+    Returns:
+        dict: "type" ("csv", "text", "parquet", ...) plus "rows", "columns" and
+        "column_types" (dtype names), "length" and "first_line" for text, or
+        "pages" for PDFs
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+
+    with _lock:
+        memo = _memo.get((path, sample_rows))
+    if memo is not None and memo[0] == stat_key:
+        return dict(memo[1])
+
+    sidecar = _sidecar(path, sample_rows)
+    info: Optional[Dict[str, Any]] = None
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if tuple(stored['stat']) == stat_key:
+            info = stored['info']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if info is None:
+        fmt = detect_format(path)
+        if fmt:
+            info = _columnar_info(path, fmt)
+        elif is_pdf(path):
+            info = {"type": "pdf", "pages": PdfDocument(path).page_count}
+        else:
+            info = _delimited_info(path, sample_rows)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(sidecar), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'path': path, 'stat': stat_key, 'info': info}, f)
+            os.replace(tmp, sidecar)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    with _lock:
+        _memo[(path, sample_rows)] = (stat_key, info)
+    return dict(info)
@@ -0,0 +1,74 @@
+# data_calls/layout_store.py
+from typing import Optional
+import hashlib
+import json
+import os
+import tempfile
+
+from data_calls.cache_paths import cache_dir
+from data_calls.feature_layout import FeatureLayout
+
+
+class LayoutStore:
+    """
+    Fitted FeatureLayouts, one JSON file per file node.
+
+    Once a node's layout is stored, later loads of that node (new rows, a
+    newer version of the file) are transformed against it instead of being
+    refit, so column order and one-hot widths stay the same as the data the
+    model was trained on.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or cache_dir('layouts')
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key: str, source: Optional[str] = None) -> Optional[FeatureLayout]:
+        """
+        Stored layout for `key`, or None (also for unreadable entries).
+
+        With `source` (the digest of the node's file), a layout fitted on
+        different contents is a miss, so a replaced file is refit.
+        """
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if source is not None and stored.get('source') != source:
+                return None
+            return FeatureLayout.from_dict(stored['layout'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, key: str, layout: FeatureLayout, source: Optional[str] = None) -> None:
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'source': source, 'layout': layout.to_dict()}, f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            # Categories that JSON cannot hold: the node is simply refit next time
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def delete(self, key: str) -> bool:
+        """Forget `key`'s layout so the next load refits; True if one existed."""
+        try:
+            os.unlink(self._path(key))
+            return True
+        except OSError:
+            return False
+
+
+_default_store: Optional[LayoutStore] = None
+
+
+def get_layout_store() -> LayoutStore:
+    """Return the process-wide store under MMP_CACHE_DIR/layouts."""
+    global _default_store
+    if _default_store is None:
+        _default_store = LayoutStore()
+    return _default_store
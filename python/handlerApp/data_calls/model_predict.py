@@ -0,0 +1,126 @@
+# data_calls/model_predict.py
+from typing import Any, Dict, List, Optional, Union
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+from data_calls.dataObjectLoad import DataLoader
+from analytics.estimators import make_estimator
+from analytics.model_store import data_fingerprint, get_model_store, model_key
+from analytics.sklearnpredictor import DENSE_ONLY_MODELS, train_model
+
+# Defaults train_model splits with; a named model is looked up under them
+_TEST_SIZE = 0.2
+_RANDOM_STATE = 42
+
+
+def _stored_key(store, fingerprint: str, model: Optional[str], label: Optional[str],
+                model_params: Optional[dict]) -> Optional[str]:
+    """Key of the stored model to predict with, or None when it has to be trained."""
+    if model is None:
+        return store.find(fingerprint, label)
+    if label is None:
+        return store.find(fingerprint, model_name=model) if not model_params else None
+    params = make_estimator(model, model_params).get_params(deep=False)
+    key = model_key(fingerprint, model, params, _RANDOM_STATE, label=label, test_size=_TEST_SIZE)
+    return key if os.path.exists(os.path.join(store.root, f"{key}.joblib")) else None
+
+
+def _feature_rows(loader: DataLoader, rows: List[Dict[str, Any]], feature_names: List[str]):
+    """Encode `rows` with the node's layout and keep the model's feature columns, in order."""
+    matrix, columns = loader.transform(pd.DataFrame(rows))
+    index = {name: i for i, name in enumerate(columns)}
+    missing = [name for name in feature_names if name not in index]
+    if missing:
+        raise ValueError(f"Rows do not produce the model's features {missing[:10]}")
+    if hasattr(matrix, 'iloc'):
+        # Split compact matrix: already a DataFrame with the layout's names
+        return matrix[list(feature_names)]
+    selected = matrix[:, [index[name] for name in feature_names]]
+    if hasattr(selected, 'tocsr'):
+        return selected.tocsr()
+    # train_model fits dense data as a DataFrame, so the estimator expects names
+    return pd.DataFrame(np.asarray(selected), columns=feature_names)
+
+
+def predict(query: str, rows: Union[Dict[str, Any], List[Dict[str, Any]]], model: Optional[str] = None,
+            label: Optional[str] = None, model_params: Optional[dict] = None) -> Dict[str, Any]:
+    """
+    Predict `label` for new rows of a file node with a stored model.
+
+    The node's matrix comes from the feature cache and the model from the
+    model store, so a dataset that was trained on before is answered
+    without refitting. Without a stored model one is trained first (and
+    stored for the next call).
+
+    Args:
+        query: File node name, alias or id
+        rows: One record or a list of records, {column: value}, in the
+            file's own columns (categoricals as text)
+        model: Estimator name; defaults to the most recently used model
+            stored for this data, or train_model's default
+        label: Target column; defaults to the stored model's, or to the
+            file's last column when a model has to be trained (see
+            DataLoader.default_label)
+        model_params: Estimator keyword arguments when training is needed
+
+    Returns:
+        dict: status, message, query, content and the raw predictions
+    """
+    start = time.perf_counter()
+    try:
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            raise ValueError("No rows to predict")
+
+        loader = DataLoader(trainme=False, query=query)
+        data = loader.load_and_process_data()
+        if not isinstance(data, tuple) or data[-1] in ('text', 'paged', 'error'):
+            raise ValueError(f"'{query}' is not a tabular file node")
+        fingerprint = loader.fingerprint or data_fingerprint(*data)
+
+        store = get_model_store()
+        key = _stored_key(store, fingerprint, model, label, model_params)
+        trained = key is None
+        if trained:
+            # Never the matrix's last column: that can be a one-hot indicator
+            label = label or loader.default_label()
+            options = {'model': model, 'label': label, 'model_params': model_params}
+            train_model(data, data_fingerprint=fingerprint, test_size=_TEST_SIZE, random_state=_RANDOM_STATE,
+                        **{k: v for k, v in options.items() if v is not None})
+            key = store.find(fingerprint, label, model)
+        entry = store.get(key) if key else None
+        if entry is None:
+            raise RuntimeError("The model could not be stored")
+
+        X = _feature_rows(loader, rows, entry['feature_names'])
+        if hasattr(X, 'tocsr') and entry['model_name'] in DENSE_ONLY_MODELS:
+            X = X.toarray()
+        predictions = entry['model'].predict(X).tolist()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        lines = [
+            f"**Model:** {entry['model_name']} ({'trained now' if trained else 'stored'})",
+            f"**Target Column:** {entry['label']}",
+        ]
+        lines += [f"- Row {i + 1}: {value}" for i, value in enumerate(predictions)]
+        return {
+            "status": "success",
+            "message": f"Predicted {len(predictions)} rows in {elapsed:.0f} ms",
+            "query": query,
+            "content": "\n".join(lines),
+            "predictions": predictions
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Prediction failed: {str(e)}",
+            "query": query,
+            "content": "",
+            "predictions": []
+        }
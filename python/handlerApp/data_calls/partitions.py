@@ -0,0 +1,183 @@
+# data_calls/partitions.py
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+import glob
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_calls.cache_paths import cache_dir
+from data_calls.columnar import detect_format, fit_columnar_layout, transform_columnar
+from data_calls.feature_layout import DEFAULT_CHUNKSIZE, FeatureLayout, block_frame, fit_csv_layout, transform_csv
+from data_calls.process_pool import pool_context
+
+_GLOB_CHARS = ('*', '?', '[')
+
+
+def expand_partitions(path: str) -> Optional[List[str]]:
+    """
+    Partition files behind a directory or glob file node.
+
+    Args:
+        path: Path from the node's importPath.module
+
+    Returns:
+        list: Sorted partition files, or None when `path` is a single file.
+        Hidden files and markers such as `_SUCCESS` are skipped.
+    """
+    if any(ch in path for ch in _GLOB_CHARS) and not os.path.exists(path):
+        matches = glob.glob(path, recursive=True)
+    elif os.path.isdir(path):
+        matches = [os.path.join(path, name) for name in os.listdir(path)]
+    else:
+        return None
+    return sorted(p for p in matches
+                  if os.path.isfile(p) and not os.path.basename(p).startswith(('.', '_')))
+
+
+# Worker functions run in the process pool: module-level so they pickle,
+# and passed plain arguments so each partition is opened in its worker
+
+def _fit_partition(path: str, chunksize: int, track_ranges: bool, overrides: Dict[str, Any],
+                   columns: Optional[Sequence[str]], filters) -> FeatureLayout:
+    fmt = detect_format(path)
+    if fmt:
+        return fit_columnar_layout(path, fmt, columns, filters, chunksize, track_ranges)
+    layout, _ = fit_csv_layout(path, chunksize, track_ranges, overrides)
+    return layout
+
+
+def _count_partition(path: str, filters) -> int:
+    fmt = detect_format(path)
+    if fmt:
+        from data_calls.columnar import _dataset, _filter_expression
+        return _dataset(path, fmt).count_rows(filter=_filter_expression(filters))
+    from data_calls.file_info import count_csv_rows
+    return count_csv_rows(path)
+
+
+def _transform_partition(path: str, state: Dict[str, Any], chunksize: int, sparse: bool, dtype: Any,
+                         exact: bool, columns: Optional[Sequence[str]], filters,
+                         out_paths: Sequence[str] = (), offset: int = 0, n_rows: int = 0):
+    layout = FeatureLayout.from_dict(state)
+    fmt = detect_format(path)
+    if sparse:
+        if fmt:
+            return transform_columnar(path, fmt, layout, columns, filters, chunksize, True, dtype, exact=exact)
+        return transform_csv(path, layout, chunksize, True, dtype, exact=exact)
+
+    # Dense: write straight into this partition's rows of the shared matrix
+    # (of each of its blocks, for a split matrix)
+    maps = [np.load(p, mmap_mode='r+') for p in out_paths]
+    blocks = tuple(m[offset:offset + n_rows] for m in maps)
+    block = blocks if len(blocks) > 1 else blocks[0]
+    if fmt:
+        transform_columnar(path, fmt, layout, columns, filters, chunksize, False, dtype, exact=exact, out=block)
+    else:
+        transform_csv(path, layout, chunksize, False, dtype, exact=exact, out=block)
+    for m in maps:
+        m.flush()
+    return n_rows
+
+
+class PartitionedSource:
+    """
+    A file node made of many partition files, encoded in a process pool.
+
+    Pass one fits every partition in parallel and merges the layouts into
+    one shared category vocabulary. Pass two has each worker encode its
+    partition straight into its row range of a single memory-mapped
+    matrix, so partitions are never stacked or concatenated.
+    """
+
+    def __init__(self, paths: List[str], chunksize: int = DEFAULT_CHUNKSIZE,
+                 columns: Optional[Sequence[str]] = None, filters=None, workers: Optional[int] = None):
+        if not paths:
+            raise ValueError("No partition files found")
+        self.paths = paths
+        self.chunksize = chunksize
+        self.columns = columns
+        self.filters = filters
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+        self.part_rows: Optional[List[int]] = None
+
+    def _map(self, fn, *iterables) -> List[Any]:
+        if self.workers == 1:
+            return list(map(fn, *iterables))
+        with ProcessPoolExecutor(self.workers, mp_context=pool_context()) as pool:
+            return list(pool.map(fn, *iterables))
+
+    def fit(self, track_ranges: bool = False) -> FeatureLayout:
+        """Fit all partitions in parallel and merge them in file order."""
+        overrides: Dict[str, Any] = {}
+        n = len(self.paths)
+        while True:
+            parts = self._map(_fit_partition, self.paths, [self.chunksize] * n, [track_ranges] * n,
+                              [overrides] * n, [self.columns] * n, [self.filters] * n)
+            layout = FeatureLayout(track_ranges)
+            for part in parts:
+                layout.merge(part)
+            if not layout.retyped:
+                self.part_rows = [part.n_rows for part in parts]
+                return layout
+            if any(detect_format(p) for p in self.paths):
+                raise ValueError(f"Columns {layout.retyped} have different types across partitions")
+            # As in fit_csv_layout: read columns of mixed type as text everywhere
+            overrides.update({col: object for col in layout.retyped})
+
+    def transform(self, layout: FeatureLayout, dtype: Any = None, exact: bool = True,
+                  sparse: bool = False) -> Any:
+        """
+        Encode every partition against `layout`, in parallel.
+
+        Args:
+            layout: Fitted layout
+            dtype: Matrix dtype, or the (numeric, one-hot) pair of a split
+                matrix (see FeatureLayout.matrix_dtype)
+            exact: See FeatureLayout.encode_into
+            sparse: Build a CSR matrix
+
+        Returns:
+            The combined matrix: a memory-mapped array (dense) or CSR matrix;
+            a DataFrame over memory-mapped blocks for a split matrix
+        """
+        split = isinstance(dtype, tuple)
+        dtypes = tuple(np.dtype(d) for d in dtype) if split else (np.dtype(dtype or layout.dtype),)
+        state = layout.to_dict()
+        n = len(self.paths)
+        dtype_arg = tuple(d.str for d in dtypes) if split else dtypes[0].str
+        common = ([state] * n, [self.chunksize] * n, [sparse] * n, [dtype_arg] * n, [exact] * n,
+                  [self.columns] * n, [self.filters] * n)
+        if sparse:
+            import scipy.sparse as sp
+            pieces = self._map(_transform_partition, self.paths, *common)
+            return sp.vstack(pieces, format='csr') if pieces else sp.csr_matrix((0, len(layout.feature_names)))
+
+        if self.part_rows is None:
+            self.part_rows = self._map(_count_partition, self.paths, [self.filters] * n)
+        width = len(layout.feature_names)
+        if width == 0:
+            return np.array([]).reshape(-1, 1)
+        offsets = np.concatenate([[0], np.cumsum(self.part_rows)[:-1]]).astype(int).tolist()
+        k = len(layout.numeric_columns)
+        widths = (k, width - k) if split else (width,)
+
+        out_paths = []
+        try:
+            for block_dtype, block_width in zip(dtypes, widths):
+                fd, out_path = tempfile.mkstemp(dir=cache_dir('partitions'), suffix='.npy')
+                os.close(fd)
+                out_paths.append(out_path)
+                np.lib.format.open_memmap(out_path, mode='w+', dtype=block_dtype,
+                                          shape=(sum(self.part_rows), block_width)).flush()
+            self._map(_transform_partition, self.paths, *common, [out_paths] * n, offsets, self.part_rows)
+            maps = [np.load(p, mmap_mode='r') for p in out_paths]
+        finally:
+            for out_path in out_paths:
+                try:
+                    os.unlink(out_path)  # the mapping stays valid until it is released
+                except OSError:
+                    pass
+        return block_frame(maps, layout.feature_names) if split else maps[0]
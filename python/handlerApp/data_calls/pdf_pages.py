@@ -0,0 +1,165 @@
+# data_calls/pdf_pages.py
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_calls.cache_paths import cache_dir
+from data_calls.process_pool import pool_context
+
+PDF_MAGIC = b'%PDF-'
+_HASH_BLOCK = 1024 * 1024
+# Below this many uncached pages a process pool costs more than it saves
+_POOL_MIN_PAGES = 8
+
+_hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_lock = threading.Lock()
+
+
+def is_pdf(path: str) -> bool:
+    """True for files that start with the PDF header, whatever their extension."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(PDF_MAGIC)) == PDF_MAGIC
+    except OSError:
+        return False
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of the file's bytes, remembered per (mtime, size)."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        memo = _hashes.get(path)
+    if memo is not None and memo[0] == stat_key:
+        return memo[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    with _lock:
+        _hashes[path] = (stat_key, digest.hexdigest())
+    return digest.hexdigest()
+
+
+# Runs in the process pool: module-level so it pickles. Each call opens
+# the PDF once and extracts a contiguous run of pages; a page that fails
+# comes back as None so it is not cached.
+
+def _extract_pages(path: str, pages: List[int]) -> List[Optional[str]]:
+    from PyPDF2 import PdfReader  # deferred: only PDF nodes need it
+    reader = PdfReader(path)
+    texts = []
+    for number in pages:
+        try:
+            texts.append(reader.pages[number].extract_text() or '')
+        except Exception as e:
+            print(f"Could not extract page {number} of {path}: {e}")
+            texts.append(None)
+    return texts
+
+
+def _write_text(path: str, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+class PdfDocument:
+    """
+    Page-level text of a PDF file node, extracted once and cached.
+
+    Extracted pages are stored as one text file per page under
+    `cache_dir('pdf', <sha256 of the PDF>)`, so an unchanged file (even
+    when moved or renamed) is never re-extracted, and reading page 40
+    of a long report touches only that page. Missing pages are extracted
+    in a process pool, in contiguous runs so each worker parses the PDF
+    once.
+    """
+
+    def __init__(self, path: str, workers: Optional[int] = None):
+        self.path = os.path.abspath(path)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.digest = file_hash(self.path)
+        self.root = cache_dir('pdf', self.digest)
+        self._page_count: Optional[int] = None
+
+    @property
+    def page_count(self) -> int:
+        if self._page_count is None:
+            meta = os.path.join(self.root, 'meta.json')
+            try:
+                with open(meta, 'r', encoding='utf-8') as f:
+                    self._page_count = int(json.load(f)['pages'])
+            except (OSError, ValueError, KeyError):
+                from PyPDF2 import PdfReader
+                self._page_count = len(PdfReader(self.path).pages)
+                _write_text(meta, json.dumps({'path': self.path, 'pages': self._page_count}))
+        return self._page_count
+
+    def _page_path(self, number: int) -> str:
+        return os.path.join(self.root, f"{number:06d}.txt")
+
+    def _cached(self, number: int) -> Optional[str]:
+        try:
+            with open(self._page_path(number), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _extract(self, numbers: List[int]) -> Dict[int, str]:
+        workers = min(self.workers, len(numbers) // _POOL_MIN_PAGES or 1)
+        if workers == 1:
+            runs = [numbers]
+        else:
+            size = -(-len(numbers) // (workers * 4))
+            runs = [numbers[i:i + size] for i in range(0, len(numbers), size)]
+        if workers == 1:
+            results = [_extract_pages(self.path, run) for run in runs]
+        else:
+            with ProcessPoolExecutor(workers, mp_context=pool_context()) as pool:
+                results = list(pool.map(_extract_pages, [self.path] * len(runs), runs))
+        texts = {}
+        for run, run_texts in zip(runs, results):
+            for number, text in zip(run, run_texts):
+                if text is None:
+                    # Failed pages are retried on the next read, not cached as empty
+                    texts[number] = ''
+                    continue
+                _write_text(self._page_path(number), text)
+                texts[number] = text
+        return texts
+
+    def pages(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Text of pages [start, stop), 0-based; only uncached pages are extracted."""
+        n = self.page_count
+        start = min(max(start, 0), n)
+        stop = n if stop is None else min(max(stop, start), n)
+        texts = {number: self._cached(number) for number in range(start, stop)}
+        missing = [number for number, text in texts.items() if text is None]
+        if missing:
+            texts.update(self._extract(missing))
+        return [texts[number] for number in range(start, stop)]
+
+    def page(self, number: int) -> str:
+        """Text of page `number` (0-based); '' past the end."""
+        pages = self.pages(number, number + 1)
+        return pages[0] if pages else ''
+
+    def text(self) -> str:
+        """Whole document, pages separated by a form feed on its own line."""
+        return '\n\f\n'.join(self.pages())
+
+    def __repr__(self) -> str:
+        return f"PdfDocument({self.path!r}, pages={self.page_count})"
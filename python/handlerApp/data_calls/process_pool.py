@@ -0,0 +1,21 @@
+# data_calls/process_pool.py
+from multiprocessing.context import BaseContext
+import multiprocessing
+import threading
+
+
+def pool_context() -> BaseContext:
+    """
+    Start method for a short-lived process pool.
+
+    Forking a process that runs other threads (the prefetch pool, the
+    dispatcher's executor) can copy a lock another thread holds into the
+    child, so those processes use forkserver, or spawn, instead of fork.
+
+    Returns:
+        BaseContext: Context to pass as ProcessPoolExecutor(mp_context=...)
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if threading.active_count() > 1:
+        return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
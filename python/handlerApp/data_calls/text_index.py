@@ -0,0 +1,233 @@
+# data_calls/text_index.py
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import glob
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import numpy as np
+
+from data_calls.cache_paths import cache_dir
+
+DEFAULT_PAGE_LINES = 100
+_SCAN_BLOCK = 4 * 1024 * 1024
+_MAX_OPEN = 32
+
+
+def _build_offsets(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Line and paragraph offsets of a text file, from one block-wise scan.
+
+    Returns:
+        tuple: (line starts plus the file size as the last entry,
+        [start, end) byte ranges of the paragraphs as an (n, 2) array)
+    """
+    newlines = []
+    base = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_SCAN_BLOCK), b''):
+            arr = np.frombuffer(block, dtype=np.uint8)
+            newlines.append(np.flatnonzero(arr == 10) + base)
+            base += len(block)
+    size = base
+    ends = np.concatenate(newlines) + 1 if newlines else np.array([], dtype=np.int64)
+    terminated = len(ends) and ends[-1] == size
+    if size and not terminated:
+        ends = np.append(ends, size)  # last line has no '\n'
+    starts = np.concatenate([[0], ends[:-1]]).astype(np.int64) if len(ends) else ends
+    lines = np.append(starts, size).astype(np.int64)
+
+    # A line is blank when nothing but its terminator ('\n' or '\r\n') is left
+    text_len = ends - starts
+    if len(text_len):
+        text_len[:len(text_len) - (0 if terminated else 1)] -= 1
+    blank = text_len == 0
+    carriage = np.flatnonzero(text_len == 1)
+    if len(carriage):
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = np.frombuffer(mm, dtype=np.uint8)
+            blank[carriage] = data[starts[carriage]] == 13
+            del data
+    content = ~blank
+    prev_blank = np.concatenate([[True], blank[:-1]])
+    next_blank = np.concatenate([blank[1:], [True]])
+    first = np.flatnonzero(content & prev_blank)
+    last = np.flatnonzero(content & next_blank)
+    paragraphs = np.stack([starts[first], ends[last]], axis=1).astype(np.int64) if len(first) \
+        else np.empty((0, 2), dtype=np.int64)
+    return lines, paragraphs
+
+
+class TextIndex:
+    """
+    Random access to a large text file by line, paragraph or page.
+
+    The offsets of every line start and paragraph are computed once per
+    file version and stored as .npy files under the cache directory; later
+    opens map them instead of rescanning. Reads slice a memory map of the
+    file, so fetching page 500 costs the same as page 0 and only the bytes
+    asked for are decoded. The map is opened on the first read and again
+    after close(), so a closed index still reads.
+    """
+
+    def __init__(self, path: str, encoding: str = 'utf-8'):
+        self.path = os.path.abspath(path)
+        self.encoding = encoding
+        st = os.stat(self.path)
+        self.stat_key = (st.st_mtime_ns, st.st_size)
+        self._lines, self._paragraphs = self._load_or_build()
+        self._file = None
+        self._mm = None
+        self._map_lock = threading.Lock()
+
+    def _index_paths(self) -> Tuple[str, str]:
+        stem = hashlib.sha1(self.path.encode('utf-8')).hexdigest()
+        version = f"{self.stat_key[0]}-{self.stat_key[1]}"
+        root = cache_dir('text_index')
+        return (os.path.join(root, f"{stem}-{version}.lines.npy"),
+                os.path.join(root, f"{stem}-{version}.paragraphs.npy"))
+
+    def _load_or_build(self) -> Tuple[np.ndarray, np.ndarray]:
+        lines_path, paragraphs_path = self._index_paths()
+        try:
+            return np.load(lines_path, mmap_mode='r'), np.load(paragraphs_path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+
+        lines, paragraphs = _build_offsets(self.path)
+        stem = os.path.basename(lines_path).split('-', 1)[0]
+        for stale in glob.glob(os.path.join(os.path.dirname(lines_path), f"{stem}-*.npy")):
+            try:
+                os.unlink(stale)  # older versions of this file
+            except OSError:
+                pass
+        for target, array in ((paragraphs_path, paragraphs), (lines_path, lines)):
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.npy.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, array, allow_pickle=False)
+                os.replace(tmp, target)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+        return lines, paragraphs
+
+    @property
+    def line_count(self) -> int:
+        return len(self._lines) - 1
+
+    @property
+    def paragraph_count(self) -> int:
+        return len(self._paragraphs)
+
+    def page_count(self, page_lines: int = DEFAULT_PAGE_LINES) -> int:
+        return -(-self.line_count // page_lines)
+
+    def _map(self):
+        # Called with _map_lock held
+        if self._mm is None:
+            self._file = open(self.path, 'rb')
+            # mmap refuses empty files; nothing to read from them anyway
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.stat_key[1] else b''
+        return self._mm
+
+    def read_bytes(self, start: int, end: int) -> str:
+        """Decode bytes [start, end) of the file."""
+        with self._map_lock:
+            data = self._map()[start:end]
+        return data.decode(self.encoding, errors='replace')
+
+    def lines(self, start: int, stop: Optional[int] = None) -> str:
+        """Lines [start, stop) as one string, terminators included."""
+        n = self.line_count
+        start = min(max(start, 0), n)
+        stop = n if stop is None else min(max(stop, start), n)
+        return self.read_bytes(int(self._lines[start]), int(self._lines[stop]))
+
+    def page(self, number: int, page_lines: int = DEFAULT_PAGE_LINES) -> str:
+        """Page `number` (0-based) of `page_lines` lines; '' past the end."""
+        return self.lines(number * page_lines, (number + 1) * page_lines)
+
+    def paragraphs(self, start: int, stop: Optional[int] = None) -> List[str]:
+        """Paragraphs [start, stop): runs of non-blank lines, without the blank lines between them."""
+        selected = self._paragraphs[max(start, 0):stop]
+        return [self.read_bytes(int(a), int(b)) for a, b in selected]
+
+    def passage_ranges(self, max_bytes: int = 2000) -> List[Tuple[int, int]]:
+        """
+        [start, end) byte ranges of retrievable passages.
+
+        Each paragraph is one passage; paragraphs longer than `max_bytes`
+        are cut at line boundaries into pieces of at most that size (a
+        single longer line stays whole).
+        """
+        ranges = []
+        for start, end in self._paragraphs.tolist():
+            if end - start <= max_bytes:
+                ranges.append((start, end))
+                continue
+            lo, hi = np.searchsorted(self._lines, [start, end])
+            piece = prev = start
+            for line_end in self._lines[lo + 1:hi + 1].tolist():
+                if line_end - piece > max_bytes and prev > piece:
+                    ranges.append((piece, prev))
+                    piece = prev
+                prev = line_end
+            ranges.append((piece, end))
+        return ranges
+
+    def close(self) -> None:
+        """Release the memory map and file descriptor."""
+        with self._map_lock:
+            if isinstance(self._mm, mmap.mmap):
+                self._mm.close()
+            if self._file is not None:
+                self._file.close()
+            self._file = self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self) -> str:
+        return (f"TextIndex({self.path!r}, lines={self.line_count}, "
+                f"paragraphs={self.paragraph_count}, bytes={self.stat_key[1]})")
+
+
+_open: 'OrderedDict[str, TextIndex]' = OrderedDict()
+_open_lock = threading.Lock()
+
+
+def open_text_index(path: str) -> TextIndex:
+    """
+    Shared TextIndex for the current version of `path`.
+
+    Up to 32 recently used files are kept open; an edited file gets a
+    fresh index. Evicted and replaced indexes are closed, which frees
+    their map and descriptor; a caller still holding one reopens it on
+    its next read.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    with _open_lock:
+        index = _open.get(path)
+        if index is not None and index.stat_key == (st.st_mtime_ns, st.st_size):
+            _open.move_to_end(path)
+            return index
+    index = TextIndex(path)
+    closing = []
+    with _open_lock:
+        previous = _open.get(path)
+        if previous is not None and previous is not index:
+            closing.append(previous)
+        _open[path] = index
+        _open.move_to_end(path)
+        while len(_open) > _MAX_OPEN:
+            closing.append(_open.popitem(last=False)[1])
+    for stale in closing:
+        stale.close()
+    return index
@@ -0,0 +1,410 @@
+# data_calls/text_search.py
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_calls.cache_paths import cache_dir
+from data_calls.columnar import detect_format
+from data_calls.data_registry import DataRegistry, get_data_registry
+from data_calls.file_info import looks_delimited
+from data_calls.pdf_pages import is_pdf
+from data_calls.text_index import open_text_index
+
+# Bump when the schema or tokenizer changes: the index is rebuilt from the files
+SCHEMA_VERSION = 1
+K1 = 1.5
+B = 0.75
+PASSAGE_BYTES = 2000
+# Seconds a writer waits for another process's transaction before failing
+BUSY_TIMEOUT = 120
+DEFAULT_TOP_K = 5
+
+_TOKEN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+
+ENGLISH_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you
+your yours yourself yourselves
+""".split())
+
+INDONESIAN_STOPWORDS = frozenset("""
+ada adalah agar akan aku anda antara apa apabila atas atau bagaimana bagi bahkan bahwa banyak
+baru beberapa begitu belum bila bisa boleh dalam dan dapat dari daripada dengan di dia dulu hanya
+harus hingga ia ialah ini itu jadi jika juga jangan kalau kami kamu karena ke kemudian kepada
+kita lagi lain lalu maka masih mau melainkan mereka meski mungkin namun nanti oleh pada para
+pernah saat saja sama sambil sampai sangat saya sebagai sebelum sedang sehingga sejak
+selain selama seperti serta setelah sudah supaya tanpa tapi telah tentang tetapi tidak untuk
+walau yaitu yakni yang
+""".split())
+
+STOPWORDS = ENGLISH_STOPWORDS | INDONESIAN_STOPWORDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    name TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS passages (
+    passage_id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    "end" INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS passages_doc ON passages(doc_id);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    passage_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, passage_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS doc_terms (
+    doc_id INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    df INTEGER NOT NULL,
+    PRIMARY KEY (doc_id, term)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    passages INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (0, 0, 0);
+"""
+
+
+@lru_cache(maxsize=200_000)
+def _term(word: str) -> Optional[str]:
+    # Light suffix stripping, applied identically to documents and queries:
+    # Indonesian particles and -nya, then English possessives and plurals.
+    # None for stopwords, before or after stripping
+    if word in STOPWORDS:
+        return None
+    if len(word) > 5 and word.endswith(('lah', 'kah', 'pun', 'nya')):
+        word = word[:-3]
+    if word.endswith(("'s", "’s")):
+        word = word[:-2]
+    if len(word) > 4 and word.endswith('ies'):
+        word = word[:-3] + 'y'
+    elif len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    return None if word in STOPWORDS else word
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Index terms of `text`: lowercased words and numbers, English and
+    Indonesian stopwords removed, common suffixes stripped.
+    """
+    terms = map(_term, _TOKEN.findall(text.lower()))
+    return [term for term in terms if term is not None]
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over text files, stored in SQLite on disk.
+
+    Documents are split into passages (paragraphs, long ones cut at line
+    boundaries); only byte offsets and postings are stored, and passage
+    text is read back from the file through its TextIndex. Each document
+    is keyed by path with its mtime and size, so `update` re-indexes only
+    files that changed and leaves the rest of the index untouched.
+
+    Several processes may share the database: every write runs in a
+    `BEGIN IMMEDIATE` transaction that re-reads the file's row first, so
+    a file another process has just indexed is not indexed twice.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(cache_dir('search'), 'bm25.sqlite')
+        self._lock = threading.RLock()
+        # isolation_level=None: transactions are opened explicitly by _write
+        self._conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT * 1000}')
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._write() as conn:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                for table in ('docs', 'passages', 'postings', 'doc_terms', 'terms', 'totals'):
+                    conn.execute(f'DROP TABLE IF EXISTS {table}')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            for statement in _SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+
+    @contextmanager
+    def _write(self):
+        """
+        One write transaction that holds the database's write lock from
+        its first statement, so what it reads cannot change before it
+        writes. Other processes wait up to BUSY_TIMEOUT for it.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def _doc(self, path: str) -> Optional[Tuple[int, Tuple[int, int]]]:
+        row = self._conn.execute('SELECT doc_id, mtime_ns, size FROM docs WHERE path = ?', (path,)).fetchone()
+        return None if row is None else (row[0], (row[1], row[2]))
+
+    def _remove(self, doc_id: int) -> None:
+        conn = self._conn
+        # A document's passages have consecutive ids, and doc_terms lists the
+        # terms it posted; together they pin its postings to ranges of the
+        # (term, passage_id) key, so no second index on postings is needed
+        count, length, lo, hi = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(length), 0), MIN(passage_id), MAX(passage_id) '
+            'FROM passages WHERE doc_id = ?', (doc_id,)
+        ).fetchone()
+        df = conn.execute('SELECT term, df FROM doc_terms WHERE doc_id = ?', (doc_id,)).fetchall()
+        conn.executemany('DELETE FROM postings WHERE term = ? AND passage_id BETWEEN ? AND ?',
+                         [(term, lo, hi) for term, _ in df])
+        conn.executemany('UPDATE terms SET df = df - ? WHERE term = ?', [(n, term) for term, n in df])
+        conn.execute('DELETE FROM terms WHERE df <= 0')
+        conn.execute('UPDATE totals SET passages = passages - ?, length = length - ?', (count, length))
+        conn.execute('DELETE FROM doc_terms WHERE doc_id = ?', (doc_id,))
+        conn.execute('DELETE FROM passages WHERE doc_id = ?', (doc_id,))
+        conn.execute('DELETE FROM docs WHERE doc_id = ?', (doc_id,))
+
+    def _add(self, path: str, name: Optional[str], stat_key: Tuple[int, int]) -> int:
+        conn = self._conn
+        doc_id = conn.execute('INSERT INTO docs (path, name, mtime_ns, size) VALUES (?, ?, ?, ?)',
+                              (path, name, *stat_key)).lastrowid
+        index = open_text_index(path)
+        df: Counter = Counter()
+        postings = []
+        total = 0
+        ranges = index.passage_ranges(PASSAGE_BYTES)
+        for start, end in ranges:
+            tokens = tokenize(index.read_bytes(start, end))
+            passage_id = conn.execute(
+                'INSERT INTO passages (doc_id, start, "end", length) VALUES (?, ?, ?, ?)',
+                (doc_id, start, end, len(tokens)),
+            ).lastrowid
+            tf = Counter(tokens)
+            postings.extend((term, passage_id, n) for term, n in tf.items())
+            df.update(tf.keys())
+            total += len(tokens)
+        # In key order, so SQLite appends to each term's b-tree range
+        postings.sort()
+        conn.executemany('INSERT INTO postings VALUES (?, ?, ?)', postings)
+        conn.executemany('INSERT INTO doc_terms VALUES (?, ?, ?)', [(doc_id, term, n) for term, n in df.items()])
+        conn.executemany('INSERT INTO terms VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df',
+                         list(df.items()))
+        conn.execute('UPDATE totals SET passages = passages + ?, length = length + ?', (len(ranges), total))
+        return doc_id
+
+    def update(self, documents: Dict[str, Optional[str]], prune: bool = True) -> Dict[str, int]:
+        """
+        Bring the index in line with `documents`.
+
+        Args:
+            documents: Absolute path -> file node name
+            prune: Also drop indexed files that are not in `documents`
+
+        Returns:
+            dict: Counts of "added", "updated", "removed" and "unchanged" files
+        """
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        with self._lock:
+            indexed = {path: (doc_id, (mtime_ns, size)) for doc_id, path, mtime_ns, size
+                       in self._conn.execute('SELECT doc_id, path, mtime_ns, size FROM docs')}
+            for path, name in documents.items():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                stat_key = (st.st_mtime_ns, st.st_size)
+                current = indexed.get(path)
+                if current is not None and current[1] == stat_key:
+                    counts['unchanged'] += 1
+                    continue
+                with self._write():  # one transaction per file
+                    # Another process may have indexed it since the snapshot
+                    current = self._doc(path)
+                    if current is not None and current[1] == stat_key:
+                        counts['unchanged'] += 1
+                        continue
+                    if current is not None:
+                        self._remove(current[0])
+                    self._add(path, name, stat_key)
+                counts['updated' if current is not None else 'added'] += 1
+            if prune:
+                for path in set(indexed) - set(documents):
+                    with self._write():
+                        current = self._doc(path)
+                        if current is None:
+                            continue
+                        self._remove(current[0])
+                    counts['removed'] += 1
+        return counts
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Top-k passages for `query` by BM25.
+
+        Returns:
+            list: Dicts with "name", "path", "start", "end", "score" and
+            "text", best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+        with self._lock:
+            n_passages, total_length = self._conn.execute('SELECT passages, length FROM totals').fetchone()
+            if not n_passages:
+                return []
+            avg_length = total_length / n_passages or 1.0
+            ids, scores = [], []
+            for term in terms:
+                row = self._conn.execute('SELECT df FROM terms WHERE term = ?', (term,)).fetchone()
+                if row is None:
+                    continue
+                idf = math.log(1 + (n_passages - row[0] + 0.5) / (row[0] + 0.5))
+                hits = np.array(self._conn.execute(
+                    'SELECT p.passage_id, p.length, t.tf FROM postings t JOIN passages p USING (passage_id) '
+                    'WHERE t.term = ?', (term,)
+                ).fetchall(), dtype=np.float64).reshape(-1, 3)
+                length, tf = hits[:, 1], hits[:, 2]
+                ids.append(hits[:, 0].astype(np.int64))
+                scores.append(idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length)))
+            if not ids:
+                return []
+            unique, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate(scores))
+            k = min(top_k, len(unique))
+            best = np.argpartition(-totals, k - 1)[:k]
+            best = best[np.argsort(-totals[best], kind='stable')]
+            placeholders = ','.join('?' * k)
+            rows = {row[0]: row[1:] for row in self._conn.execute(
+                f'SELECT p.passage_id, d.path, d.name, p.start, p."end" FROM passages p '
+                f'JOIN docs d USING (doc_id) WHERE p.passage_id IN ({placeholders})',
+                [int(unique[i]) for i in best],
+            )}
+
+        results = []
+        for i in best:
+            path, name, start, end = rows[int(unique[i])]
+            results.append({
+                'name': name,
+                'path': path,
+                'start': start,
+                'end': end,
+                'score': float(totals[i]),
+                'text': open_text_index(path).read_bytes(start, end).strip(),
+            })
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """Indexed documents, passages, distinct terms and postings."""
+        with self._lock:
+            conn = self._conn
+            return {
+                'documents': conn.execute('SELECT COUNT(*) FROM docs').fetchone()[0],
+                'passages': conn.execute('SELECT passages FROM totals').fetchone()[0],
+                'terms': conn.execute('SELECT COUNT(*) FROM terms').fetchone()[0],
+                'postings': conn.execute('SELECT COUNT(*) FROM postings').fetchone()[0],
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def text_documents(registry: Optional[DataRegistry] = None) -> Dict[str, Optional[str]]:
+    """
+    Path -> name of every file node the loader would read as plain text.
+
+    Delimited, columnar, PDF, directory and unreadable nodes are left out.
+    """
+    registry = registry or get_data_registry()
+    documents: Dict[str, Optional[str]] = {}
+    for node in registry.file_nodes():
+        path = registry.path(node)
+        if path in documents or not os.path.isfile(path) or detect_format(path) or is_pdf(path):
+            continue
+        try:
+            if looks_delimited(path):
+                continue
+        except (OSError, UnicodeDecodeError):
+            continue
+        documents[path] = node.get('name')
+    return documents
+
+
+_default_index: Optional[SearchIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Return the process-wide index under MMP_CACHE_DIR/search."""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = SearchIndex()
+        return _default_index
+
+
+def search_documents(query: str, top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
+    """
+    Search every text file node in the diagram and return the best passages.
+
+    Files added or edited since the last call are (re-)indexed first; the
+    rest of the index is reused as is.
+    """
+    try:
+        index = get_search_index()
+        index.update(text_documents())
+        results = index.search(query, int(top_k))
+        if not results:
+            return {
+                "status": "error",
+                "message": "No matching passages found",
+                "query": query,
+                "content": "",
+                "results": []
+            }
+        content = "\n\n".join(
+            f"Passage {i + 1} ({r['name']}):\n{r['text']}" for i, r in enumerate(results)
+        )
+        return {
+            "status": "success",
+            "message": f"Found {len(results)} passages",
+            "query": query,
+            "content": content,
+            "results": results
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Search failed: {str(e)}",
+            "query": query,
+            "content": "",
+            "results": []
+        }
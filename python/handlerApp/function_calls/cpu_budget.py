@@ -0,0 +1,99 @@
+# function_calls/cpu_budget.py
+"""
+How many cores one process may use for a CPU-heavy call such as train_model.
+
+The worker pool runs several processes side by side. If each of them let
+scikit-learn (`n_jobs=-1`) and BLAS/OpenMP use every core, N concurrent
+trainings would run N x cores threads; if each used one thread, a lone
+training would leave the other cores idle. Instead the pool's cores are
+tokens (CorePool): each call takes a share of the free ones when it starts
+and returns them when it ends, so the budgets of concurrent calls never
+add up to more than the machine. A call's budget is published in
+MMP_CPU_BUDGET and in the usual BLAS/OpenMP thread variables, and
+estimators are built with that many jobs.
+"""
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import os
+
+BUDGET_ENV = 'MMP_CPU_BUDGET'
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS',
+)
+
+
+def available_cpus() -> int:
+    """Cores this process may run on (its affinity mask where the OS has one)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def cpu_budget() -> int:
+    """The process's core budget: MMP_CPU_BUDGET if set, else every available core."""
+    try:
+        return max(1, int(os.environ[BUDGET_ENV]))
+    except (KeyError, ValueError):
+        return available_cpus()
+
+
+class CorePool:
+    """
+    The machine's cores as tokens handed to calls.
+
+    A call holds its tokens until it ends, so the cores in use never
+    exceed `cores`. Every call needs at least one; when none is free the
+    call waits for a running one to finish instead of oversubscribing.
+    Not thread-safe: the worker pool's dispatch thread is its only user.
+    """
+
+    def __init__(self, cores: Optional[int] = None):
+        self.cores = max(1, cores or available_cpus())
+        self.free = self.cores
+
+    def acquire(self, demand: int) -> int:
+        """
+        Take an equal share for one of `demand` calls competing for cores.
+
+        Returns:
+            int: Cores taken, at least 1, at most what is free; 0 when no
+            core is free
+        """
+        if self.free < 1:
+            return 0
+        n = max(1, min(self.free, self.cores // max(1, demand)))
+        self.free -= n
+        return n
+
+    def release(self, n: int) -> None:
+        """Return `n` cores taken by acquire."""
+        self.free = min(self.cores, self.free + n)
+
+
+def set_cpu_budget(n: int) -> int:
+    """
+    Give this process (and its children) a budget of `n` cores.
+
+    The thread variables only take effect in BLAS/OpenMP runtimes loaded
+    after this call, so worker processes call it before importing numpy;
+    `limit_threads` covers runtimes that are already loaded.
+    """
+    n = max(1, int(n))
+    os.environ[BUDGET_ENV] = str(n)
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(n)
+    return n
+
+
+@contextmanager
+def limit_threads(n: Optional[int] = None) -> Iterator[int]:
+    """Cap BLAS/OpenMP thread pools at `n` (default: the budget) for the block."""
+    n = n if n and n > 0 else cpu_budget()
+    try:
+        from threadpoolctl import threadpool_limits  # installed with scikit-learn
+    except ImportError:
+        yield n
+        return
+    with threadpool_limits(limits=n):
+        yield n
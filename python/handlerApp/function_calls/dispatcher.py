@@ -0,0 +1,181 @@
+# function_calls/dispatcher.py
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import importlib
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_calls.diagram_graph import FUNCTION_TYPES
+from data_calls.diagram_registry import DiagramDiff, DiagramRegistry, get_registry
+
+
+class ResolvedCallable:
+    """A node's callable together with what it took to import it."""
+
+    def __init__(self, node_id: str, module: str, function: str, func: Callable, import_seconds: float):
+        self.node_id = node_id
+        self.module = module
+        self.function = function
+        self.func = func
+        self.import_seconds = import_seconds
+
+    @property
+    def target(self) -> Tuple[str, str]:
+        return self.module, self.function
+
+
+class FunctionDispatcher:
+    """
+    Resolve diagram function nodes to callables once and cache them.
+
+    Modules are imported lazily on a node's first call. Each node has its
+    own lock, so importing a heavy module (sklearn, pandas) for one node
+    never blocks resolving an unrelated node such as `add_numbers`.
+    When the diagram is reloaded, only nodes whose `importPath` or
+    `parameters` changed are dropped and re-resolved.
+    """
+
+    def __init__(self, registry: Optional[DiagramRegistry] = None, reimport_on_change: bool = True):
+        self.registry = registry or get_registry()
+        self.reimport_on_change = reimport_on_change
+        self._resolved: Dict[str, ResolvedCallable] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.registry.subscribe(self._on_diagram_change)
+
+    def _node(self, key: str) -> Dict[str, Any]:
+        node = self.registry.resolve(key)
+        if node is None:
+            raise KeyError(f"No node with name, alias or id {key!r}")
+        return node
+
+    def _lock_for(self, node_id: str) -> threading.Lock:
+        lock = self._locks.get(node_id)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(node_id, threading.Lock())
+        return lock
+
+    def resolve(self, key: str) -> Callable:
+        """
+        Return the callable behind a node, importing its module on first use.
+
+        Args:
+            key: Node name, alias or id
+
+        Returns:
+            Callable: `getattr(import_module(importPath.module), importPath.function)`
+        """
+        node = self._node(key)
+        import_path = node.get('importPath') or {}
+        target = (import_path.get('module', ''), import_path.get('function', ''))
+
+        resolved = self._resolved.get(node['id'])
+        if resolved is not None and resolved.target == target:
+            return resolved.func
+
+        with self._lock_for(node['id']):
+            resolved = self._resolved.get(node['id'])
+            if resolved is not None and resolved.target == target:
+                return resolved.func
+
+            module_name, function_name = target
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+                func = getattr(module, function_name)
+            except (ImportError, AttributeError) as e:
+                raise ImportError(f"Cannot resolve node {node.get('name')!r} to "
+                                  f"{module_name}.{function_name}: {e}") from e
+            elapsed = time.perf_counter() - start
+
+            self._resolved[node['id']] = ResolvedCallable(node['id'], module_name, function_name, func, elapsed)
+            return func
+
+    def call(self, key: str, *args, **kwargs) -> Any:
+        """Resolve `key` and call it with the given arguments."""
+        return self.resolve(key)(*args, **kwargs)
+
+    def function_nodes(self) -> List[Dict[str, Any]]:
+        """Return every node in the current diagram that can be dispatched."""
+        return [n for n in self.registry.snapshot().nodes if n.get('type') in FUNCTION_TYPES]
+
+    def warm_up(self, keys: Optional[Iterable[str]] = None, background: bool = False,
+                max_workers: int = 4) -> Dict[str, Any]:
+        """
+        Pre-import nodes so their first call does not pay the import.
+
+        Args:
+            keys: Node names/aliases/ids to warm; defaults to every function node
+            background: Return immediately with futures instead of waiting
+            max_workers: Threads used to import modules side by side
+
+        Returns:
+            dict: node id -> import seconds (or a Future when `background`),
+                  failures map to the exception raised
+        """
+        if keys is None:
+            node_ids = [n['id'] for n in self.function_nodes()]
+        else:
+            node_ids = [self._node(k)['id'] for k in keys]
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='warm-up')
+        futures: Dict[str, Future] = {node_id: executor.submit(self._warm_one, node_id) for node_id in node_ids}
+        executor.shutdown(wait=not background)
+        if background:
+            return futures
+        return {node_id: f.result() for node_id, f in futures.items()}
+
+    def _warm_one(self, node_id: str) -> Any:
+        try:
+            self.resolve(node_id)
+            return self._resolved[node_id].import_seconds
+        except Exception as e:
+            return e
+
+    def import_report(self) -> List[Dict[str, Any]]:
+        """Per-node import cost of everything resolved so far, slowest first."""
+        snap = self.registry.snapshot()
+        rows = [{
+            "id": r.node_id,
+            "name": (snap.by_id.get(r.node_id) or {}).get('name'),
+            "target": f"{r.module}.{r.function}",
+            "import_ms": r.import_seconds * 1000,
+        } for r in list(self._resolved.values())]
+        return sorted(rows, key=lambda row: row["import_ms"], reverse=True)
+
+    def _on_diagram_change(self, diff: DiagramDiff):
+        in_use = [i for i in diff.changed if i in self._resolved]
+        for node_id in diff.removed + diff.changed:
+            self._resolved.pop(node_id, None)
+        # Re-resolve only what was already in use, off the caller's thread
+        stale = [i for i in in_use if diff.new.by_id[i].get('type') in FUNCTION_TYPES]
+        if self.reimport_on_change and stale:
+            self.warm_up(stale, background=True)
+
+
+_dispatcher: Optional[FunctionDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> FunctionDispatcher:
+    """Return the process-wide dispatcher over the default diagram."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = FunctionDispatcher()
+    return _dispatcher
+
+
+if __name__ == "__main__":
+    dispatcher = get_dispatcher()
+    for node_id, result in dispatcher.warm_up().items():
+        if isinstance(result, Exception):
+            print(f"{node_id}: {result}")
+    for row in dispatcher.import_report():
+        print(f"{row['import_ms']:>10.1f} ms  {row['name']:<24} {row['target']}")
+    print(dispatcher.call('multiply_numbers', [3, 7, 9]))
@@ -0,0 +1,465 @@
+# function_calls/worker_pool.py
+"""
+Resident pool of pre-forked worker processes that execute function nodes.
+
+Every worker imports its modules once and then serves requests for the rest
+of its life, so a call only pays for the function itself. Clients talk to
+the supervisor over a local socket in length-prefixed JSON frames:
+
+    4-byte big-endian payload length | UTF-8 JSON payload
+
+    request:  {"name": "multiply_numbers", "args": [], "kwargs": {"numbers": [3, 7]}}
+    response: {"status": "success", "result": 21}
+              {"status": "error", "message": "..."}
+
+The supervisor dispatches requests, not connections: each request goes to
+the next idle worker over a pipe and the response comes back the same way.
+A connection holds no worker between calls, so any number of clients share
+the workers. Requests queue while every worker is busy, and a connection's
+requests are answered in order.
+
+Start the service from the `python/handlerApp` directory with
+
+    python function_calls/worker_pool.py --workers 4 --warm-up
+"""
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple, Union
+import argparse
+import json
+import multiprocessing
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_calls.cpu_budget import CorePool, available_cpus, set_cpu_budget
+
+Address = Union[str, Tuple[str, int]]
+
+_HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+_RECV_BYTES = 64 * 1024
+
+if hasattr(socket, 'AF_UNIX'):
+    DEFAULT_ADDRESS: Address = os.path.join(tempfile.gettempdir(), 'mmp-dispatcher.sock')
+else:
+    DEFAULT_ADDRESS = ('127.0.0.1', 3002)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def send_frame(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Write one length-prefixed JSON message."""
+    payload = json.dumps(message, default=str).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Read one length-prefixed JSON message; None when the peer closed."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {size} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        return None
+    return json.loads(payload)
+
+
+def _listen(address: Address, backlog: int = 128) -> socket.socket:
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.unlink(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    return sock
+
+
+def _handle(dispatcher, request: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        result = dispatcher.call(request['name'], *request.get('args', []), **request.get('kwargs', {}))
+        return {"status": "success", "result": result}
+    except Exception as e:
+        return {"status": "error", "message": f"{type(e).__name__}: {e}"}
+
+
+def _serve(dispatcher, payload: bytes, budget: int) -> bytes:
+    """Run one request frame's payload under a budget of `budget` cores; returns the response payload."""
+    try:
+        request = json.loads(payload)
+    except ValueError as e:
+        response = {"status": "error", "message": f"Malformed request: {e}"}
+    else:
+        set_cpu_budget(budget)
+        response = _handle(dispatcher, request)
+    return json.dumps(response, default=str).encode('utf-8')
+
+
+def _worker_main(conn, warm_up: Union[bool, List[str]]) -> None:
+    # The supervisor owns shutdown; workers just stop when told to
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Before numpy/sklearn load, so BLAS and OpenMP pools can use the whole
+    # machine; each call is then limited to the budget it is sent with
+    set_cpu_budget(available_cpus())
+    from function_calls.dispatcher import get_dispatcher
+
+    dispatcher = get_dispatcher()
+    if warm_up:
+        dispatcher.warm_up(None if warm_up is True else warm_up)
+
+    while True:
+        try:
+            budget, payload = conn.recv()
+        except (EOFError, OSError):
+            return  # the supervisor is gone
+        conn.send_bytes(_serve(dispatcher, payload, budget))
+
+
+class _Client:
+    """One client connection: bytes read and not yet framed, requests waiting, bytes to write."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.requests: deque = deque()
+        self.in_flight = False
+        self.closed = False
+
+
+class DispatcherService:
+    """
+    Supervisor for the worker pool.
+
+    A dispatch thread accepts client connections, reads request frames and
+    hands each request to an idle worker over the worker's pipe, so
+    CPU-heavy calls such as `train_model` run on several cores at once and
+    a slow or idle client never holds a worker. Workers that die are
+    replaced, and a call that was running in one is answered with an
+    error instead of being run again. Workers are started with forkserver
+    (spawn where it is unavailable), so they do not inherit client
+    sockets, and are not daemonic, so a call can start its own process
+    pool (partitioned loads, PDF pages, compare); stop() terminates them.
+
+    Each call's CPU budget, which sizes estimator `n_jobs` and BLAS/OpenMP
+    threads, is taken from a CorePool of the machine's cores: an equal
+    share of the free cores among the calls running or waiting, returned
+    when the call ends. A lone training uses the whole machine, and the
+    budgets of concurrent calls never add up to more than the cores. A
+    request that finds every core held waits for one to be returned, as it
+    does for a busy worker; budgets cannot shrink once an estimator is
+    running, so this is the price of never oversubscribing.
+    """
+
+    def __init__(self, address: Address = DEFAULT_ADDRESS, workers: Optional[int] = None,
+                 warm_up: Union[bool, List[str]] = False):
+        self.address = address
+        self.n_workers = workers or os.cpu_count() or 1
+        self.warm_up = warm_up
+        self.listener: Optional[socket.socket] = None
+        self.workers: List[Optional[multiprocessing.Process]] = []
+        self._pipes: List[Any] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._clients: Dict[int, _Client] = {}
+        self._ready: deque = deque()  # clients with a request waiting and none in flight
+        self._idle: List[int] = []
+        self._calls: Dict[int, _Client] = {}  # worker slot -> client whose call it runs
+        self._cores = CorePool()
+        self._held: Dict[int, int] = {}  # worker slot -> cores its call holds
+
+    def _spawn(self, slot: int) -> None:
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child, self.warm_up), name='mmp-worker')
+        proc.start()
+        child.close()
+        self.workers[slot] = proc
+        self._pipes[slot] = parent
+        self._selector.register(parent, selectors.EVENT_READ, ('worker', slot))
+        self._idle.append(slot)
+
+    def start(self) -> 'DispatcherService':
+        """Start the workers and the dispatch thread; returns immediately."""
+        self.listener = _listen(self.address)
+        self.listener.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.listener, selectors.EVENT_READ, ('accept', None))
+        self.workers = [None] * self.n_workers
+        self._pipes = [None] * self.n_workers
+        for slot in range(self.n_workers):
+            self._spawn(slot)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='mmp-dispatch', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self, poll: float = 1.0) -> None:
+        """Block until stop() or Ctrl-C."""
+        try:
+            while not self._stop.wait(poll):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        for proc in self.workers:
+            if proc is not None and proc.is_alive():
+                proc.terminate()
+        for proc in self.workers:
+            if proc is not None:
+                proc.join()
+        self.workers = []
+        for pipe in self._pipes:
+            if pipe is not None:
+                pipe.close()
+        self._pipes = []
+        for client in list(self._clients.values()):
+            client.sock.close()
+        self._clients.clear()
+        self._ready.clear()
+        self._calls.clear()
+        self._held.clear()
+        self._cores = CorePool()
+        self._idle = []
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    # Everything below runs on the dispatch thread only
+
+    def _run(self, poll: float = 0.5) -> None:
+        while not self._stop.is_set():
+            for key, events in self._selector.select(poll):
+                kind, slot = key.data
+                if kind == 'accept':
+                    self._accept()
+                elif kind == 'worker':
+                    self._worker_ready(slot)
+                else:
+                    client = self._clients.get(key.fd)
+                    if client is None:
+                        continue
+                    if events & selectors.EVENT_READ:
+                        self._read(client)
+                    if events & selectors.EVENT_WRITE and not client.closed:
+                        self._write(client)
+            self._dispatch()
+
+    def _accept(self) -> None:
+        try:
+            sock, _ = self.listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        if sock.family != getattr(socket, 'AF_UNIX', None):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._clients[sock.fileno()] = _Client(sock)
+        self._selector.register(sock, selectors.EVENT_READ, ('client', None))
+
+    def _read(self, client: _Client) -> None:
+        try:
+            data = client.sock.recv(_RECV_BYTES)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(client)
+            return
+        client.inbuf += data
+        while len(client.inbuf) >= _HEADER.size:
+            (size,) = _HEADER.unpack_from(client.inbuf)
+            if size > MAX_FRAME_BYTES:
+                print(f"Dropping a client that sent a frame of {size} bytes")
+                self._close(client)
+                return
+            if len(client.inbuf) < _HEADER.size + size:
+                break
+            client.requests.append(bytes(client.inbuf[_HEADER.size:_HEADER.size + size]))
+            del client.inbuf[:_HEADER.size + size]
+        if client.requests and not client.in_flight and client not in self._ready:
+            self._ready.append(client)
+
+    def _write(self, client: _Client) -> None:
+        try:
+            sent = client.sock.send(client.outbuf)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(client)
+            return
+        del client.outbuf[:sent]
+        if not client.outbuf:
+            self._selector.modify(client.sock, selectors.EVENT_READ, ('client', None))
+
+    def _respond(self, client: _Client, payload: bytes) -> None:
+        if client.closed:
+            return
+        if not client.outbuf:
+            self._selector.modify(client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, ('client', None))
+        client.outbuf += _HEADER.pack(len(payload)) + payload
+        client.in_flight = False
+        if client.requests:
+            self._ready.append(client)
+
+    def _close(self, client: _Client) -> None:
+        client.closed = True
+        self._clients.pop(client.sock.fileno(), None)
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def _dispatch(self) -> None:
+        while self._ready and self._idle and self._cores.free:
+            client = self._ready.popleft()
+            if client.closed or client.in_flight or not client.requests:
+                continue
+            # A lone call gets every free core; calls arriving together split them
+            demand = min(self.n_workers, len(self._calls) + len(self._ready) + 1)
+            budget = self._cores.acquire(demand)
+            slot = self._idle.pop()
+            payload = client.requests.popleft()
+            client.in_flight = True
+            self._calls[slot] = client
+            self._held[slot] = budget
+            try:
+                self._pipes[slot].send((budget, payload))
+            except OSError:
+                # Never reached the worker: queue it again for the next one
+                del self._calls[slot]
+                client.in_flight = False
+                client.requests.appendleft(payload)
+                self._ready.appendleft(client)
+                self._worker_died(slot)
+
+    def _worker_ready(self, slot: int) -> None:
+        try:
+            payload = self._pipes[slot].recv_bytes()
+        except (EOFError, OSError):
+            self._worker_died(slot)
+            return
+        client = self._calls.pop(slot, None)
+        self._cores.release(self._held.pop(slot, 0))
+        self._idle.append(slot)
+        if client is not None:
+            self._respond(client, payload)
+
+    def _worker_died(self, slot: int) -> None:
+        proc, pipe = self.workers[slot], self._pipes[slot]
+        self._selector.unregister(pipe)
+        pipe.close()
+        proc.join(1.0)
+        if slot in self._idle:
+            self._idle.remove(slot)
+        self._cores.release(self._held.pop(slot, 0))
+        client = self._calls.pop(slot, None)
+        if client is not None:
+            # The call may have had side effects: report it, never rerun it
+            message = {"status": "error", "message": f"Worker exited with {proc.exitcode} during the call"}
+            self._respond(client, json.dumps(message).encode('utf-8'))
+        if not self._stop.is_set():
+            print(f"Worker {proc.pid} exited with {proc.exitcode}, restarting")
+            self._spawn(slot)
+
+
+class DispatcherClient:
+    """Persistent connection to a DispatcherService."""
+
+    def __init__(self, address: Address = DEFAULT_ADDRESS, timeout: Optional[float] = None):
+        self.address = address
+        self.timeout = timeout
+        self._connect()
+
+    def _connect(self) -> None:
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.address)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        """Run node `name` in a worker and return its result."""
+        message = {"name": name, "args": list(args), "kwargs": kwargs}
+        try:
+            send_frame(self.sock, message)
+        except (BrokenPipeError, ConnectionResetError):
+            # The service closed this connection (e.g. it was restarted). A
+            # frame that was not written whole is never run, so resending
+            # on a new connection cannot run the call twice
+            self.sock.close()
+            self._connect()
+            send_frame(self.sock, message)
+        # Once the request is written it is never resent: the call may have run
+        response = recv_frame(self.sock)
+        if response is None:
+            raise ConnectionError("Dispatcher closed the connection before responding")
+        if response.get("status") != "success":
+            raise RuntimeError(response.get("message"))
+        return response.get("result")
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _parse_address(value: str) -> Address:
+    host, sep, port = value.rpartition(':')
+    if sep and port.isdigit():
+        return host or '127.0.0.1', int(port)
+    return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the MMP function-node worker pool")
+    parser.add_argument('--address', default=DEFAULT_ADDRESS, type=_parse_address,
+                        help="Unix socket path or host:port (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--warm-up', nargs='*', default=None,
+                        help="Pre-import node names in every worker; no names warms all function nodes")
+    cli = parser.parse_args()
+
+    warm: Union[bool, List[str]] = False if cli.warm_up is None else (cli.warm_up or True)
+    service = DispatcherService(cli.address, cli.workers, warm).start()
+    print(f"Serving {service.n_workers} workers on {service.address}")
+    service.serve_forever()